@@ -7,13 +7,49 @@ Author: Auguste de Pennart
 Description:
     This program finds number of genome assemblies for user-specified taxid or taxon
     
+List of classes:
+    RequestScheduler:
+        token bucket rate limiter and thread pool shared by all NCBI requests
+    ConnectionPool:
+        keep-alive HTTP connections shared by all NCBI requests, retrying throttled and failed requests
+    PooledResponse:
+        response of ConnectionPool, returning its connection to the pool once read
+    ResponseCache:
+        on-disk SQLite cache of NCBI responses with per-database expiry and least recently used eviction
+    TaxdumpIndex:
+        memory-mapped taxonomy index built from NCBI taxdump nodes.dmp, names.dmp and merged.dmp
+    AssemblyIndex:
+        SQLite index of taxid and species taxid to assembly accessions, built from an assembly_summary file
+    Checkpoint:
+        journal of traversal and assembly search progress, appended as saved, for resuming interrupted runs
+    Profiler:
+        timers and counters of every E-utilities request, stage and generation, with summary table and trace file
+    TaxonGenomeClient:
+        importable interface for resolving taxa and finding descendants, species and assemblies, memos kept between queries
+    QueryHandler:
+        HTTP/JSON request handler of the query service, answering queries with a TaxonGenomeClient
+
 List of functions:
+    profile_stage:
+        times a stage of the run when profiling, otherwise does nothing
+    entrez_open:
+        reads NCBI E-utilities url from the response cache, or once the request scheduler allows it
     entrez_search:
         parses NCBI database entrez search to xml
     entrez_fetch:
         parses NCBI database entrez fetch to xml
+    entrez_summary:
+        parses NCBI database entrez summary to xml
+    entrez_search_pages:
+        pages through NCBI database entrez search with the history server, yielding ids a page at a time
     data_find:
         populates a list with elements of interest from a xml variable
+    data_stream:
+        populates lists with all elements of interest in one pass over a streamed xml response
+    taxon_split:
+        splits streamed taxonomy xml into taxon, taxonomic rank and taxid of each record
+    summary_split:
+        splits streamed assembly summary xml into genome id and species taxid of each record
     taxon_or_taxid:
         searches database for reciprocal taxid or taxon
     lineage_search:
@@ -26,9 +62,29 @@ List of functions:
         and whether it's a species to is_species dictionary
     species_find:
         find species by for looping through nested generations dictionary and creating a list of species
+    subtree_find:
+        finds all species below taxon of interest with one paged NCBI taxonomy subtree search
+    genome_search:
+        finds assembled genome ids of one species
+    genome_merge:
+        merges genome ids added or modified since previous run into genome ids of previous run
     assembled_genome_find:
         Takes user input as either taxa(word) or taxid(number) and creates a regex searchable
         format for said input.
+    subtree_genome_find:
+        finds assembled genomes of all species below taxon of interest with one paged NCBI assembly search
+    pipeline_find:
+        searches assembled genomes of each species as soon as child_find finds it, printing results as they complete
+    genome_find:
+        finds assembled genomes of all species below one taxon of interest, in the mode chosen by user
+    batch_find:
+        finds assembled genomes for every taxon or taxid in an input file, each shared taxon searched once
+    output_name:
+        output file name of one taxon of an input file
+    output_read:
+        reads species and genome ids of a previous output file, as written by print_to_output
+    serve:
+        runs the local HTTP/JSON query service until interrupted
 
 List of "non standard modules"
     No "non standard modules" are used in the program.
@@ -43,7 +99,16 @@ Procedure:
     7. print number of genomes assembled for each species
 
 Usage:
-    python NCBI_Taxon_Genome_link.py [-h] [-v] [-s] -e EMAIL -i USER_INPUT [USER_INPUT ...] [-o OUTPUT]
+    python NCBI_Taxon_Genome_link.py [-h] [-v] [-s] -e EMAIL (-i USER_INPUT [USER_INPUT ...] | --input_file INPUT_FILE | --serve PORT) [-o OUTPUT] [-b BATCH_SIZE] [-k API_KEY] [-t THREADS]
+                                 [--cache CACHE] [--cache_size CACHE_SIZE] [--no_cache] [--refresh]
+                                 [--taxdump TAXDUMP] [--assembly_summary ASSEMBLY_SUMMARY] [-m {traversal,subtree}]
+                                 [--page_size PAGE_SIZE] [--resume STATE] [-p] [--timeout TIMEOUT] [--retries RETRIES]
+                                 [-c] [--update PREVIOUS] [--since SINCE] [--profile] [--trace TRACE]
+
+    or imported as a library:
+        from NCBI_Taxon_Genome_link import TaxonGenomeClient
+        client = TaxonGenomeClient(EMAIL)
+        client.assemblies('Hominidae')
 
 known error:
     1. lineage_search and lineage_visualisation are obsolete right now, finding parent could be of use in future program development
@@ -59,12 +124,32 @@ known error:
 # import modules
 # ----------------------------------------------------------------------------------------
 import re  # module for using regex
+import json #module for checkpoint state files
 import argparse #module for terminal use
-from urllib.request import urlopen  # module to open the url
+import os #module for cache file paths
+import time #module for rate limiting requests
+import random #module for jitter of retry delays
+import http.client #module for keep-alive connections to NCBI
+from email.utils import parsedate_to_datetime #module for Retry-After dates
+import sqlite3 #module for the response cache
+import io #module for streaming cached responses
+import gzip #module for reading compressed assembly_summary files
+import mmap #module for memory mapping the taxdump index
+import struct #module for the taxdump index header
+import bisect #module for searching the taxdump index
+from array import array #module for compact taxdump index arrays
+import threading #module for sharing the rate limiter between threads
+from contextlib import contextmanager, nullcontext #module for timing stages when profiling
+from collections import deque #module for pages being searched
+from concurrent.futures import ThreadPoolExecutor #module for running requests concurrently
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer #module for the query service
+from urllib.parse import urlsplit, quote, parse_qs  # module to split the url into host and path, url format email and read service queries
+from urllib.error import HTTPError  # module for failed url requests
 from lxml import etree  # module to read xml files
 
 #argparse
 # ----------------------------------------------------------------------------------------
+cache_path = os.path.join(os.path.expanduser('~'), '.cache', 'NCBI_Taxon_Genome_link.sqlite') #default response cache file
 #program description
 usage='This program finds number of genome assemblies for user-specified taxid or taxon'
 parser=argparse.ArgumentParser(description=usage)#create an argument parser
@@ -84,23 +169,1200 @@ req_arg.add_argument('-e', '--email',
                     dest='email',
                     required=True,
                     help="email required to access NCBI's databases")
-#creates the argument where taxon or taxid will be inputted
-req_arg.add_argument('-i', '--input',
+#creates the argument where taxon or taxid will be inputted, or input file of many
+input_arg = req_arg.add_mutually_exclusive_group(required=True)
+input_arg.add_argument('-i', '--input',
                     metavar='USER_INPUT',
                     dest='user_input',
                     nargs='+',
-                    required=True,
                     help='user-specified taxid or taxon')
+input_arg.add_argument('--input_file',
+                    metavar='INPUT_FILE',
+                    dest='input_file',
+                    help='file of user-specified taxids or taxa, one per line')
+input_arg.add_argument('--serve',
+                    metavar='PORT',
+                    dest='serve',
+                    type=int,
+                    help='runs a local HTTP/JSON query service on PORT instead of searching once')
 #creates the optinal argument for output file name
 parser.add_argument('-o', '--output',
                     metavar='OUTPUT',
                     dest='outputfile',
                     help='optional genome assembled outputfile')
-args=parser.parse_args()#parses command line
+#creates the optional argument for number of taxids fetched per request
+parser.add_argument('-b', '--batch_size',
+                    metavar='BATCH_SIZE',
+                    dest='batch_size',
+                    type=int,
+                    default=500,
+                    help='number of taxids fetched per NCBI request (default 500)')
+#creates the optional argument for NCBI api key, raising the request limit
+parser.add_argument('-k', '--api_key',
+                    metavar='API_KEY',
+                    dest='api_key',
+                    help='NCBI api key, allows 10 instead of 3 requests per second')
+#creates the optional argument for number of concurrent requests
+parser.add_argument('-t', '--threads',
+                    metavar='THREADS',
+                    dest='threads',
+                    type=int,
+                    default=None,
+                    help='number of concurrent NCBI requests (default requests per second limit)')
+#creates the optional argument for response cache file name
+parser.add_argument('--cache',
+                    metavar='CACHE',
+                    dest='cache',
+                    default=cache_path,
+                    help='response cache file (default ~/.cache/NCBI_Taxon_Genome_link.sqlite)')
+#creates the optional argument for response cache size limit
+parser.add_argument('--cache_size',
+                    metavar='CACHE_SIZE',
+                    dest='cache_size',
+                    type=int,
+                    default=500,
+                    help='response cache size limit in MB, least recently used responses removed first (default 500)')
+#creates the argument to not use the response cache
+parser.add_argument('--no_cache',
+                    action='store_true',
+                    dest='no_cache',
+                    help='does not read or write the response cache')
+#creates the argument to ignore cached responses and replace them
+parser.add_argument('--refresh',
+                    action='store_true',
+                    dest='refresh',
+                    help='ignores cached responses, replacing them with new ones')
+#creates the optional argument for offline taxonomy from NCBI taxdump
+parser.add_argument('--taxdump',
+                    metavar='TAXDUMP',
+                    dest='taxdump',
+                    help='folder of NCBI taxdump nodes.dmp and names.dmp, taxonomy searched offline')
+#creates the optional argument for offline assembly counts from assembly_summary file
+parser.add_argument('--assembly_summary',
+                    metavar='ASSEMBLY_SUMMARY',
+                    dest='assembly_summary',
+                    help='NCBI assembly_summary_genbank.txt or assembly_summary_refseq.txt, assemblies searched offline')
+#creates the optional argument for how species below taxon are found
+parser.add_argument('-m', '--mode',
+                    dest='mode',
+                    choices=['traversal', 'subtree'],
+                    default='traversal',
+                    help='traversal searches each generation of children taxa, subtree searches all species below taxon at once (default traversal)')
+#creates the optional argument for number of ids per page of large searches
+parser.add_argument('--page_size',
+                    metavar='PAGE_SIZE',
+                    dest='page_size',
+                    type=int,
+                    default=10000,
+                    help='number of ids per page of NCBI searches, larger searches paged through the history server (default 10000)')
+#creates the optional argument for checkpoint state file
+parser.add_argument('--resume',
+                    metavar='STATE',
+                    dest='resume',
+                    help='checkpoint state file, progress saved to it and an interrupted run resumed from it')
+#creates the argument to search assemblies while children taxa are still being found
+parser.add_argument('-p', '--pipeline',
+                    action='store_true',
+                    dest='pipeline',
+                    help='searches assemblies of each species as soon as it is found, in traversal mode')
+#creates the optional argument for seconds waited for NCBI to answer
+parser.add_argument('--timeout',
+                    metavar='TIMEOUT',
+                    dest='timeout',
+                    type=float,
+                    default=60,
+                    help='seconds waited for NCBI to answer a request (default 60)')
+#creates the optional argument for number of retries of failed requests
+parser.add_argument('--retries',
+                    metavar='RETRIES',
+                    dest='retries',
+                    type=int,
+                    default=5,
+                    help='number of retries of throttled or failed NCBI requests (default 5)')
+#creates the argument to find only the number of assembled genomes
+parser.add_argument('-c', '--count_only',
+                    action='store_true',
+                    dest='count_only',
+                    help='finds only the number of assembled genomes of each species, not their ids')
+#creates the optional argument for previous output file, updated with assemblies added or modified since
+parser.add_argument('--update',
+                    metavar='PREVIOUS',
+                    dest='update',
+                    help='previous output file, only assemblies added or modified since searched and merged into it')
+#creates the optional argument for date of previous run
+parser.add_argument('--since',
+                    metavar='SINCE',
+                    dest='since',
+                    help='date of previous run as YYYY/MM/DD, with --update (default modification date of PREVIOUS)')
+#creates the argument to print a profile of requests and stages at end of run
+parser.add_argument('--profile',
+                    action='store_true',
+                    dest='profile',
+                    help='prints timings of every NCBI request, stage and generation at end of run')
+#creates the optional argument for trace file
+parser.add_argument('--trace',
+                    metavar='TRACE',
+                    dest='trace',
+                    help='trace file of every request and stage, loadable in chrome://tracing or Perfetto')
+
+#global variables
+# ----------------------------------------------------------------------------------------
+post_limit=200 #number of ids above which requests are sent by POST, as advised by NCBI
+page_size=10000 #ids per page of paged entrez searches, set by TaxonGenomeClient
+checkpoint_batch=100 #species searched for assemblies between checkpoints
+cache_stream_limit=16*1024*1024 #bytes of a streamed response kept for the cache, larger responses not cached so memory stays bounded
+resolve_memo={} #user input and its (taxon, taxid), each searched once per run
+taxon_memo={} #taxid and its (taxon, taxonomic rank, taxid) record, each fetched once per run
+children_memo={} #taxid and its children taxids, each searched once per run
+lineage_memo={} #taxid and its (taxon, taxonomic rank, taxid, lineage) record of subtree searches, each fetched once per run
+genome_memo={} #species and its genome ids, each searched once per run
+count_memo={} #species and its number of genomes, each searched once per run
+#taxonomic ranks below species, searched in subtree mode when sub_species flag raised
+sub_species_ranks=['subspecies', 'varietas', 'forma', 'strain', 'serotype', 'serogroup', 'biotype',
+                   'genotype', 'morph', 'pathogroup', 'forma%20specialis', 'isolate']
+api_key=None #NCBI api key added to every request, set by TaxonGenomeClient
+email=None #email added to every request, so NCBI can contact user, set by TaxonGenomeClient
+tool='NCBI_Taxon_Genome_link' #program name added to every request
+eutils='https://eutils.ncbi.nlm.nih.gov/entrez/eutils/' #base url of NCBI E-utilities, set by TaxonGenomeClient
+request_limit = 3 #NCBI requests allowed per second, 10 with api key
+#seconds cached responses are kept for each database, taxonomy changes rarely and assembly often
+cache_ttl = {'taxonomy': 30*24*3600, 'assembly': 24*3600}
+cache_ttl_default = 7*24*3600 #seconds cached responses are kept for other databases
+#modification dates of assemblies searched when updating previous output file, from previous run to today, None otherwise
+update_window = None
+previous_genomes = {} #genomes of previous output file, updated by this run
+
+#classes
+# ----------------------------------------------------------------------------------------
+
+# RequestScheduler
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # rate:
+        # number of requests allowed per second
+    # workers:
+        # number of requests run concurrently
+# use:
+    # token bucket rate limiter and thread pool shared by all NCBI requests,
+    # tokens refill at rate per second and each request takes one,
+    # so concurrent requests never exceed NCBI's per second limit
+# methods:
+    # wait:
+        # blocks until a request token is available
+    # map:
+        # runs function on every item concurrently, returning results in item order
+    # close:
+        # shuts down thread pool
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+class RequestScheduler:
+    def __init__(self, rate=3, workers=None):
+        self.rate = rate #tokens added per second
+        self.tokens = 1.0 #tokens available, one so the first request is not delayed
+        self.last = time.monotonic() #time tokens were last refilled
+        self.lock = threading.Lock() #lock so threads share tokens
+        self.workers = workers or rate #number of concurrent requests
+        self.pool = ThreadPoolExecutor(max_workers=self.workers) #thread pool for concurrent requests
+
+    def wait(self):
+        while 1: #while loop that breaks once a token is taken
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(1.0, self.tokens + (now - self.last) * self.rate) #refills tokens, bucket holds one token so requests are evenly spaced
+                self.last = now
+                if self.tokens >= 1: #takes token and lets request through
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate #time till next token
+            time.sleep(delay)
+
+    def map(self, function=None, items=None):
+        return list(self.pool.map(function, items)) #pool.map keeps results in item order, so output is deterministic
+
+    def close(self):
+        self.pool.shutdown()
+
+scheduler = RequestScheduler(request_limit) #request scheduler shared by all NCBI requests, replaced by TaxonGenomeClient
+
+# ConnectionPool
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # timeout:
+        # seconds waited for server to answer
+    # retries:
+        # number of retries of throttled or failed requests
+    # backoff:
+        # seconds waited before first retry, doubled for each later retry
+# use:
+    # keep-alive HTTP connections shared by all NCBI requests, so each request
+    # does not open a new connection, gzip compressed responses asked for,
+    # throttled (429), server error (5xx) and dropped requests retried after
+    # exponential backoff with jitter, or after the server's Retry-After time,
+    # idle connections closed by the server sent again at once on a new connection, without using a retry
+# methods:
+    # request:
+        # sends GET request, or POST request when data given, returning PooledResponse
+    # connect:
+        # idle connection to host, or new connection, and whether it is reused
+    # release:
+        # returns connection to pool once its response is read
+    # discard:
+        # closes idle connections to host, once one is found closed by the server
+    # close:
+        # closes all idle connections
+    # delay:
+        # seconds waited before a retry
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+class ConnectionPool:
+    retry_status = {429, 500, 502, 503, 504} #statuses retried
+    max_delay = 60 #longest wait before a retry, in seconds
+
+    def __init__(self, timeout=60, retries=5, backoff=1.0):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.idle = {} #(scheme, host) and its idle connections
+        self.lock = threading.Lock() #lock so threads share idle connections
+
+    def connect(self, scheme=None, host=None):
+        with self.lock:
+            idle = self.idle.get((scheme, host))
+            if idle: #reuses idle connection
+                return idle.pop(), True
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, timeout=self.timeout), False
+        return http.client.HTTPConnection(host, timeout=self.timeout), False
+
+    def release(self, scheme=None, host=None, connection=None):
+        with self.lock:
+            self.idle.setdefault((scheme, host), []).append(connection)
+
+    def discard(self, scheme=None, host=None):
+        with self.lock:
+            idle = self.idle.pop((scheme, host), [])
+        for connection in idle: #idle as long or longer than connection closed by server
+            connection.close()
+
+    def close(self):
+        for scheme, host in list(self.idle):
+            self.discard(scheme, host)
+
+    def delay(self, attempt=0, response=None):
+        retry_after = response.getheader('Retry-After') if response else None
+        if retry_after: #server's wait time, in seconds or as a date
+            try:
+                return min(self.max_delay, float(retry_after))
+            except ValueError:
+                try:
+                    return min(self.max_delay, max(0, parsedate_to_datetime(retry_after).timestamp() - time.time()))
+                except (TypeError, ValueError):
+                    pass
+        #exponential backoff, with jitter so threads do not retry at once
+        return min(self.max_delay, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+    def request(self, url=None, data=None, wait=None):
+        parts = urlsplit(url)
+        path = parts.path + ('?' + parts.query if parts.query else '')
+        headers = {'Accept-Encoding': 'gzip', 'User-Agent': tool} #gzip compressed responses asked for
+        if data is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        attempt = 0 #retries used
+        stale = False #whether request is sent again after an idle connection was found closed
+        retried = False #whether request was sent more than once
+        backoff = 0.0 #seconds slept before retries
+        while 1:
+            if wait and not stale: #waits for request token, also before retries
+                wait()
+            connection, reused = self.connect(parts.scheme, parts.netloc)
+            stale = False
+            sent = time.perf_counter() #time request sent, for latency of its answer
+            try:
+                connection.request('POST' if data is not None else 'GET', path, body=data, headers=headers)
+                response = connection.getresponse()
+            except (OSError, http.client.HTTPException) as error: #connection dropped or timed out
+                connection.close()
+                if reused and not isinstance(error, TimeoutError): #idle connection closed by server, sent again at once on a new connection
+                    self.discard(parts.scheme, parts.netloc)
+                    stale = retried = True
+                    continue
+                if attempt == self.retries:
+                    raise
+                delay = self.delay(attempt)
+                if profiler:
+                    profiler.count(f'retry {error.__class__.__name__}')
+                print(f'{error.__class__.__name__} from {parts.netloc}, retrying in {delay:.1f} seconds') #prints to standard output retry
+                time.sleep(delay)
+                attempt += 1
+                retried = True
+                backoff += delay
+                continue
+            if response.status == 200:
+                pooled = PooledResponse(self, parts.scheme, parts.netloc, connection, response, url, data, wait)
+                pooled.sent, pooled.retried, pooled.backoff = sent, retried, backoff
+                return pooled
+            response.read() #reads error response, so connection can be reused
+            if response.will_close:
+                connection.close()
+            else:
+                self.release(parts.scheme, parts.netloc, connection)
+            if response.status in self.retry_status and attempt < self.retries:
+                delay = self.delay(attempt, response)
+                if profiler:
+                    profiler.count(f'retry {response.status}')
+                print(f'{response.status} {response.reason} from {parts.netloc}, retrying in {delay:.1f} seconds') #prints to standard output retry
+                time.sleep(delay)
+                attempt += 1
+                retried = True
+                backoff += delay
+                continue
+            raise HTTPError(url, response.status, response.reason, response.headers, None)
+
+# PooledResponse
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # pool:
+        # ConnectionPool of connection
+    # scheme, host:
+        # scheme and host of connection
+    # connection:
+        # connection response read from
+    # response:
+        # http.client response
+    # url, data, wait:
+        # request of response, sent again when connection dropped while reading
+# use:
+    # file of response of ConnectionPool, decompressed when gzip compressed,
+    # returning its connection to the pool once read to end,
+    # connection dropped while reading retried as other dropped requests, and read on from where it dropped
+# methods:
+    # read:
+        # reads response content
+    # resume:
+        # sends request again, skipping content already read
+    # close:
+        # reads rest of response and returns connection to pool
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+class PooledResponse:
+    def __init__(self, pool=None, scheme=None, host=None, connection=None, response=None, url=None, data=None, wait=None):
+        self.pool = pool
+        self.url = url
+        self.data = data
+        self.wait = wait
+        self.attempt = 0 #retries of dropped reads used
+        self.scheme = scheme
+        self.host = host
+        self.connection = connection
+        self.response = response
+        self.released = False #whether connection returned to pool
+        self.size = 0 #bytes of response read, decompressed
+        self.on_release = None #function called with response once read to end, for profiling
+        self.sent = None #time request of response sent, set by pool
+        self.retried = False #whether request was sent more than once, set by pool and when read retried
+        self.backoff = 0.0 #seconds slept before retries, set by pool and added to when read retried
+        self.resent = 0.0 #seconds spent sending request again when read retried
+        if response.getheader('Content-Encoding') == 'gzip': #compressed response decompressed while read
+            self.stream = gzip.GzipFile(fileobj=response)
+        else:
+            self.stream = response
+
+    def read(self, size=-1):
+        while 1:
+            try:
+                content = self.stream.read(size) if size >= 0 else self.stream.read() #whole response read to its length, not until connection closes
+                break
+            except (OSError, EOFError, http.client.HTTPException) as error: #connection dropped while reading, not reused
+                self.released = True
+                self.connection.close()
+                if self.attempt >= self.pool.retries:
+                    raise
+                delay = self.pool.delay(self.attempt)
+                self.attempt += 1
+                if profiler:
+                    profiler.count(f'retry {error.__class__.__name__}')
+                print(f'{error.__class__.__name__} while reading from {self.host}, retrying in {delay:.1f} seconds') #prints to standard output retry
+                start = time.perf_counter()
+                time.sleep(delay)
+                self.resume()
+                self.retried = True
+                self.backoff += delay
+                self.resent += time.perf_counter() - start
+        self.size += len(content)
+        if not self.released and self.response.isclosed(): #response read to end
+            self.released = True
+            if self.response.will_close:
+                self.connection.close()
+            else:
+                self.pool.release(self.scheme, self.host, self.connection)
+            if self.on_release:
+                self.on_release(self)
+        return content
+
+    def resume(self):
+        retry = self.pool.request(self.url, self.data, self.wait)
+        self.backoff += retry.backoff
+        skip = self.size #content already read
+        while skip: #same request answers same content, already read content skipped
+            content = retry.stream.read(min(skip, 65536))
+            if not content: #answer shorter than content already read
+                retry.connection.close()
+                raise http.client.IncompleteRead(b'', skip)
+            skip -= len(content)
+        self.connection, self.response, self.stream = retry.connection, retry.response, retry.stream
+        self.released = False
+
+    def close(self):
+        while not self.released and self.read(65536): #reads rest of response, so connection can be reused
+            pass
+
+http_pool = ConnectionPool() #connection pool shared by all NCBI requests, replaced by TaxonGenomeClient
+
+# ResponseCache
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # path:
+        # SQLite file of cached responses
+    # max_size:
+        # cache size limit in bytes
+    # refresh:
+        # ignores cached responses, replacing them with new ones
+# use:
+    # on-disk cache of NCBI responses keyed on database, query type (esearch/efetch) and query,
+    # responses older than their database's cache_ttl are refetched,
+    # and least recently used responses removed when cache exceeds max_size,
+    # access times of cache hits kept in memory and written together, every flush_hits hits and before responses are evicted
+# methods:
+    # get:
+        # returns cached response, or None if missing or expired
+    # put:
+        # adds response to cache and evicts least recently used responses
+    # flush:
+        # writes access times of cache hits, lock held by caller
+    # close:
+        # closes cache file
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+class ResponseCache:
+    flush_hits = 1000 #cache hits whose access times are written together
+
+    def __init__(self, path=None, max_size=None, refresh=False):
+        if os.path.dirname(path): #creates cache folder if missing
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_size = max_size #cache size limit in bytes
+        self.refresh = refresh #flag for ignoring cached responses
+        self.lock = threading.Lock() #lock so threads share one connection
+        self.connection = sqlite3.connect(path, check_same_thread=False) #connection to cache file
+        self.connection.execute('PRAGMA journal_mode=WAL') #faster writes, readers not blocked
+        self.connection.execute('''CREATE TABLE IF NOT EXISTS responses (
+                                   database TEXT, query_type TEXT, query TEXT, content BLOB,
+                                   size INTEGER, created REAL, accessed REAL,
+                                   PRIMARY KEY (database, query_type, query))''')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+        self.connection.commit()
+        self.size = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0] #current cache size in bytes
+        self.accessed = {} #key of cache hits and their access time, not yet written
+
+    def get(self, database=None, query_type=None, query=None):
+        if self.refresh: #cached responses ignored
+            return None
+        key = (database, query_type, query)
+        with self.lock:
+            row = self.connection.execute('''SELECT content, size, created FROM responses
+                                             WHERE database=? AND query_type=? AND query=?''', key).fetchone()
+            if not row: #response not cached
+                return None
+            content, size, created = row
+            if time.time() - created > cache_ttl.get(database, cache_ttl_default): #response expired, removed
+                self.connection.execute('DELETE FROM responses WHERE database=? AND query_type=? AND query=?', key)
+                self.size -= size
+                self.connection.commit()
+                return None
+            self.accessed[key] = time.time() #marks response as recently used
+            if len(self.accessed) >= self.flush_hits:
+                self.flush()
+        return content
+
+    def flush(self):
+        if not self.accessed:
+            return
+        self.connection.executemany('''UPDATE responses SET accessed=?
+                                       WHERE database=? AND query_type=? AND query=?''',
+                                    [(accessed,) + key for key, accessed in self.accessed.items()])
+        self.connection.commit()
+        self.accessed = {}
+
+    def put(self, database=None, query_type=None, query=None, content=None):
+        key = (database, query_type, query)
+        now = time.time()
+        with self.lock:
+            self.flush() #access times written, so least recently used responses evicted first
+            old = self.connection.execute('''SELECT size FROM responses
+                                             WHERE database=? AND query_type=? AND query=?''', key).fetchone()
+            if old: #replaced response no longer counted
+                self.size -= old[0]
+            self.connection.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                    key + (content, len(content), now, now))
+            self.size += len(content)
+            while self.size > self.max_size: #removes least recently used responses till under size limit
+                oldest = self.connection.execute('''SELECT database, query_type, query, size FROM responses
+                                                    ORDER BY accessed LIMIT 100''').fetchall()
+                if not oldest:
+                    break
+                for row in oldest:
+                    if self.size <= self.max_size:
+                        break
+                    self.connection.execute('DELETE FROM responses WHERE database=? AND query_type=? AND query=?', row[:3])
+                    self.size -= row[3]
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            self.connection.close()
+
+cache = None #response cache shared by all NCBI requests, None when not used, opened by TaxonGenomeClient
+
+# CacheTee
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # response:
+        # PooledResponse streamed
+    # database, query_type, query:
+        # key of response in response cache
+    # cache_if:
+        # function of response content, response only cached when it returns True, None caches every response
+# use:
+    # file of response parsed while read, keeping the content read,
+    # added to the response cache once read to end, so cached responses are still streamed,
+    # responses not read to end (parse failed) not cached, and responses larger than cache_stream_limit
+    # neither kept nor cached, so memory stays bounded by cache_stream_limit however large the response
+# methods:
+    # read:
+        # reads response content, keeping it for the cache
+    # close:
+        # reads rest of response and returns connection to pool
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+class CacheTee:
+    def __init__(self, response=None, database=None, query_type=None, query=None, cache_if=None):
+        self.response = response
+        self.key = (database, query_type, query)
+        self.cache_if = cache_if
+        self.content = [] #content read, for the cache
+        self.size = 0 #bytes of content read
+        self.cached = False #whether content added to cache, or given up as too large
+
+    def read(self, size=-1):
+        content = self.response.read(size)
+        if content and not self.cached:
+            self.content.append(content)
+            self.size += len(content)
+            if self.size > cache_stream_limit: #response too large to keep, not cached
+                self.cached = True
+                self.content = []
+        elif not content and not self.cached: #response read to end, added to cache
+            self.cached = True
+            whole = b''.join(self.content) #whole response
+            if self.cache_if is None or self.cache_if(whole):
+                cache.put(*self.key, whole)
+            self.content = []
+        return content
+
+    def close(self):
+        self.response.close()
+
+# TaxdumpIndex
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # path:
+        # taxdump index file made by TaxdumpIndex.build
+# use:
+    # memory-mapped taxonomy index built from NCBI taxdump nodes.dmp and names.dmp,
+    # taxa are stored by position in taxid order, as arrays of parent, rank and scientific name,
+    # children of each taxon as one array with offsets, all names sorted for name lookup,
+    # and taxids merged into another sorted with the taxon they were merged into,
+    # so nothing is parsed when the index is opened
+# methods:
+    # build:
+        # parses nodes.dmp, names.dmp and merged.dmp once and writes the index file
+    # open:
+        # opens index in taxdump folder, building it first if missing or older than the .dmp files
+    # position:
+        # position of taxid in index, None if not present
+    # current:
+        # taxid, or taxid it was merged into from merged.dmp, None if not present
+    # name:
+        # scientific name of taxid, None if not present
+    # rank:
+        # taxonomic rank of taxid
+    # children:
+        # list of children taxids of taxid
+    # lineage:
+        # list of scientific names from root to taxid
+    # lookup:
+        # taxid of case insensitive name, scientific names before other names, None if not present
+    # records:
+        # (taxon, taxonomic rank, taxid) of each taxid, formatted as taxon_split
+    # close:
+        # closes index file, memory map freed once its views are
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+class TaxdumpIndex:
+    magic = b'NTGLIDX2' #marks file as taxdump index, of this layout
+    header = '<8s13I' #magic and byte size of each section
+    #name classes added to name lookup
+    lookup_classes = {'scientific name', 'synonym', 'equivalent name', 'genbank common name',
+                      'common name', 'blast name', 'genbank synonym', 'acronym', 'genbank acronym'}
+
+    def __init__(self, path=None):
+        self.file = open(path, 'rb')
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) #index memory mapped, pages read when used
+        view = memoryview(self.buffer)
+        header = struct.unpack_from(self.header, self.buffer, 0)
+        if header[0] != self.magic: #checks file is a taxdump index
+            raise ValueError(f'{path} is not a taxdump index, please remove it and try again')
+        sections = [] #views of each section
+        offset = struct.calcsize(self.header)
+        for size in header[1:]:
+            sections.append(view[offset:offset+size])
+            offset += size + (-size % 4) #sections padded to 4 bytes
+        (taxids, parents, ranks, name_offsets, self.names, child_offsets, children,
+         lookup_offsets, self.lookup_names, lookup_taxa, rank_names, merged_taxids, merged_taxa) = sections
+        self.taxids = taxids.cast('I') #taxids in increasing order
+        self.parents = parents.cast('I') #parent position of each taxon
+        self.ranks = ranks.cast('I') #rank number of each taxon
+        self.name_offsets = name_offsets.cast('I') #start of each scientific name in names
+        self.child_offsets = child_offsets.cast('I') #start of each taxon's children in child_positions
+        self.child_positions = children.cast('I') #children positions grouped by parent
+        self.lookup_offsets = lookup_offsets.cast('I') #start of each lookup name in lookup_names
+        self.lookup_taxa = lookup_taxa.cast('I') #taxon position of each lookup name
+        self.rank_names = bytes(rank_names).decode().split('\n') #rank of each rank number
+        self.merged_taxids = merged_taxids.cast('I') #taxids merged into another, in increasing order
+        self.merged_taxa = merged_taxa.cast('I') #position of taxon each merged taxid was merged into
+
+    @classmethod
+    def build(cls, taxdump=None, path=None):
+        taxid_list = array('I') #taxid of each node
+        parent_taxids = array('I') #parent taxid of each node
+        rank_list = array('I') #rank number of each node
+        rank_number = {} #rank and its rank number
+        with open(os.path.join(taxdump, 'nodes.dmp')) as nodes:
+            for line in nodes: #fields separated by tab pipe tab
+                fields = line.rstrip('\t|\n').split('\t|\t')
+                taxid_list.append(int(fields[0]))
+                parent_taxids.append(int(fields[1]))
+                rank_list.append(rank_number.setdefault(fields[2], len(rank_number)))
+        order = sorted(range(len(taxid_list)), key=taxid_list.__getitem__) #nodes in taxid order
+        taxids = array('I', (taxid_list[n] for n in order))
+        ranks = array('I', (rank_list[n] for n in order))
+        position = {taxid: n for n, taxid in enumerate(taxids)} #taxid and its position
+        parents = array('I', (position[parent_taxids[n]] for n in order))
+        del taxid_list, parent_taxids, rank_list, order
+        scientific = [''] * len(taxids) #scientific name of each position
+        lookup = [] #lowercase name, scientific name first, and position of every lookup name
+        with open(os.path.join(taxdump, 'names.dmp')) as names:
+            for line in names:
+                fields = line.rstrip('\t|\n').split('\t|\t')
+                if fields[3] not in cls.lookup_classes:
+                    continue
+                n = position[int(fields[0])]
+                if fields[3] == 'scientific name':
+                    scientific[n] = fields[1]
+                lookup.append((fields[1].lower().encode(), fields[3] != 'scientific name', n))
+        lookup.sort()
+        name_offsets = array('I', [0]) #scientific names joined, with offsets
+        names = bytearray()
+        for name in scientific:
+            names += name.encode()
+            name_offsets.append(len(names))
+        del scientific
+        lookup_offsets = array('I', [0]) #lookup names joined, with offsets
+        lookup_names = bytearray()
+        lookup_taxa = array('I')
+        for name, not_scientific, n in lookup:
+            lookup_names += name
+            lookup_offsets.append(len(lookup_names))
+            lookup_taxa.append(n)
+        del lookup
+        child_count = array('I', bytes(4 * (len(taxids) + 1))) #children of each position, offset by one
+        for n, parent in enumerate(parents):
+            if parent != n: #root is its own parent
+                child_count[parent + 1] += 1
+        for n in range(len(taxids)): #cumulative counts become offsets
+            child_count[n + 1] += child_count[n]
+        child_offsets = array('I', child_count)
+        children = array('I', bytes(4 * child_offsets[-1]))
+        for n, parent in enumerate(parents): #children filled in taxid order
+            if parent != n:
+                children[child_count[parent]] = n
+                child_count[parent] += 1
+        rank_names = '\n'.join(sorted(rank_number, key=rank_number.get)).encode()
+        merged = [] #old taxid and position of taxon it was merged into
+        if os.path.exists(os.path.join(taxdump, 'merged.dmp')): #merged taxids optional, older taxdumps may lack it
+            with open(os.path.join(taxdump, 'merged.dmp')) as merged_file:
+                for line in merged_file:
+                    fields = line.rstrip('\t|\n').split('\t|\t')
+                    if int(fields[1]) in position: #merged into a taxon still in nodes.dmp
+                        merged.append((int(fields[0]), position[int(fields[1])]))
+        merged.sort()
+        merged_taxids = array('I', (old for old, n in merged))
+        merged_taxa = array('I', (n for old, n in merged))
+        sections = [taxids.tobytes(), parents.tobytes(), ranks.tobytes(), name_offsets.tobytes(), bytes(names),
+                    child_offsets.tobytes(), children.tobytes(), lookup_offsets.tobytes(), bytes(lookup_names),
+                    lookup_taxa.tobytes(), rank_names, merged_taxids.tobytes(), merged_taxa.tobytes()]
+        with open(path + '.tmp', 'wb') as index: #written to temporary file, so an interrupted build leaves no index
+            index.write(struct.pack(cls.header, cls.magic, *[len(section) for section in sections]))
+            for section in sections:
+                index.write(section)
+                index.write(bytes(-len(section) % 4))
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def open(cls, taxdump=None):
+        path = os.path.join(taxdump, 'taxdump.idx') #index kept beside the .dmp files
+        dmp_files = [os.path.join(taxdump, dmp) for dmp in ('nodes.dmp', 'names.dmp', 'merged.dmp') if os.path.exists(os.path.join(taxdump, dmp))]
+        magic = None #magic of existing index, older layouts rebuilt
+        if os.path.exists(path):
+            with open(path, 'rb') as index:
+                magic = index.read(len(cls.magic))
+        if magic != cls.magic or any(os.path.getmtime(dmp) > os.path.getmtime(path) for dmp in dmp_files):
+            print(f'building taxdump index {path}') #prints to standard output that index being built
+            cls.build(taxdump, path)
+        return cls(path)
+
+    def position(self, taxid=None):
+        n = bisect.bisect_left(self.taxids, int(taxid))
+        if n < len(self.taxids) and self.taxids[n] == int(taxid):
+            return n
+        return None
+
+    def current(self, taxid=None):
+        if self.position(taxid) is not None:
+            return str(taxid)
+        n = bisect.bisect_left(self.merged_taxids, int(taxid))
+        if n < len(self.merged_taxids) and self.merged_taxids[n] == int(taxid): #taxid merged into another
+            return str(self.taxids[self.merged_taxa[n]])
+        return None
+
+    def name(self, taxid=None):
+        n = self.position(taxid)
+        if n is None:
+            return None
+        return bytes(self.names[self.name_offsets[n]:self.name_offsets[n+1]]).decode()
+
+    def rank(self, taxid=None):
+        return self.rank_names[self.ranks[self.position(taxid)]]
+
+    def children(self, taxid=None):
+        n = self.position(taxid)
+        return [str(self.taxids[child]) for child in self.child_positions[self.child_offsets[n]:self.child_offsets[n+1]]]
+
+    def lineage(self, taxid=None):
+        lineage = [] #scientific names from taxid to root
+        n = self.position(taxid)
+        while self.taxids[n] != 1: #root left out, as in NCBI taxonomy lineage
+            lineage.append(bytes(self.names[self.name_offsets[n]:self.name_offsets[n+1]]).decode())
+            if self.parents[n] == n:
+                break
+            n = self.parents[n]
+        return lineage[::-1]
+
+    def lookup(self, name=None):
+        key = name.lower().encode()
+        low, high = 0, len(self.lookup_taxa) #binary search through sorted lookup names
+        while low < high:
+            middle = (low + high) // 2
+            if bytes(self.lookup_names[self.lookup_offsets[middle]:self.lookup_offsets[middle+1]]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.lookup_taxa) and bytes(self.lookup_names[self.lookup_offsets[low]:self.lookup_offsets[low+1]]) == key:
+            return str(self.taxids[self.lookup_taxa[low]])
+        return None
+
+    def records(self, taxids=None):
+        records = [] #assigned list for taxonomy records
+        for taxid in taxids:
+            if self.position(taxid) is None: #taxid missing from taxdump
+                continue
+            #replaces white space with %20 and adds double quotes, as in taxon_split
+            records.append(('\"'+ self.name(taxid).replace(" ", "%20") + '\"', '\"'+ self.rank(taxid).replace(" ", "%20") + '\"', str(taxid)))
+        return records
+
+    def close(self):
+        self.file.close()
+
+taxdump = None #offline taxonomy index, None when not used, opened by TaxonGenomeClient
+
+# AssemblyIndex
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # path:
+        # assembly index file made by AssemblyIndex.build
+# use:
+    # SQLite index of taxid and species taxid to assembly accessions,
+    # built in one pass over an assembly_summary file, read line by line and
+    # written in chunks so memory stays constant however large the file
+# methods:
+    # build:
+        # streams assembly_summary file (plain or .gz) into the index file
+    # open:
+        # opens index beside assembly_summary file, building it first if missing or older than the file
+    # lookup:
+        # list of assembly accessions with taxid as taxid or species taxid
+    # count:
+        # number of assembly accessions with taxid as taxid or species taxid
+    # close:
+        # closes index file
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+class AssemblyIndex:
+    chunk = 10000 #rows written to index at once
+
+    def __init__(self, path=None):
+        self.lock = threading.Lock() #lock so threads share one connection
+        self.connection = sqlite3.connect(path, check_same_thread=False) #connection to index file
+
+    @classmethod
+    def build(cls, assembly_summary=None, path=None):
+        opener = gzip.open if assembly_summary.endswith('.gz') else open #compressed files read directly
+        connection = sqlite3.connect(path + '.tmp') #written to temporary file, so an interrupted build leaves no index
+        connection.execute('DROP TABLE IF EXISTS assemblies')
+        connection.execute('CREATE TABLE assemblies (accession TEXT, taxid INTEGER, species_taxid INTEGER)')
+        columns = {'assembly_accession': 0, 'taxid': 5, 'species_taxid': 6} #column of each field, unless header says otherwise
+        rows = [] #chunk of rows to be written
+        with opener(assembly_summary, 'rt') as summary:
+            for line in summary:
+                if line.startswith('#'): #comment lines, one holding the column names
+                    header = line.lstrip('# ').rstrip('\n').split('\t')
+                    if 'assembly_accession' in header:
+                        columns = {field: header.index(field) for field in columns}
+                    continue
+                fields = line.rstrip('\n').split('\t')
+                rows.append((fields[columns['assembly_accession']], int(fields[columns['taxid']]), int(fields[columns['species_taxid']])))
+                if len(rows) >= cls.chunk:
+                    connection.executemany('INSERT INTO assemblies VALUES (?, ?, ?)', rows)
+                    rows = []
+        connection.executemany('INSERT INTO assemblies VALUES (?, ?, ?)', rows)
+        connection.execute('CREATE INDEX assemblies_taxid ON assemblies (taxid)') #indexes made after inserts, faster
+        connection.execute('CREATE INDEX assemblies_species_taxid ON assemblies (species_taxid)')
+        connection.commit()
+        connection.close()
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def open(cls, assembly_summary=None):
+        path = assembly_summary + '.idx' #index kept beside the assembly_summary file
+        if not os.path.exists(path) or os.path.getmtime(assembly_summary) > os.path.getmtime(path):
+            print(f'building assembly index {path}') #prints to standard output that index being built
+            cls.build(assembly_summary, path)
+        return cls(path)
+
+    def lookup(self, taxid=None):
+        with self.lock:
+            rows = self.connection.execute('''SELECT accession FROM assemblies
+                                              WHERE species_taxid=? OR taxid=? ORDER BY rowid''', (int(taxid), int(taxid))).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self, taxid=None):
+        with self.lock:
+            return self.connection.execute('''SELECT COUNT(*) FROM assemblies
+                                              WHERE species_taxid=? OR taxid=?''', (int(taxid), int(taxid))).fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+assemblies = None #offline assembly index, None when not used, opened by TaxonGenomeClient
+
+# Checkpoint
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # path:
+        # checkpoint state file
+    # query:
+        # dictionary of user input and options, state file only resumed for the same query
+# use:
+    # state file of traversal and assembly search progress, for resuming interrupted runs,
+    # state held as a dictionary, written as a journal of json lines, the query first,
+    # then one record of each generation or batch of species as saved, merged into the state when resumed,
+    # so each save writes only its new progress, and a record cut off by an interruption is dropped when resumed
+# methods:
+    # save:
+        # appends record of new progress to state file
+    # merge:
+        # merges record into state, dictionaries merged key by key and other values replaced
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+class Checkpoint:
+    def __init__(self, path=None, query=None):
+        self.path = path #checkpoint state file
+        self.lock = threading.Lock() #lock so one thread saves at a time
+        self.state = {'query': query} #progress of run
+        if os.path.exists(path): #resumes earlier run
+            with open(path, 'rb') as state_file:
+                lines = state_file.read().split(b'\n')
+            state = json.loads(lines[0])
+            if state.get('query') != query: #prints to standard output that state file is of another query, exits script
+                print(f'{path} is a checkpoint of another input or options, please remove it or use another state file')
+                exit()
+            end = len(lines[0]) + 1 #end of records read whole
+            for line in lines[1:]:
+                try:
+                    self.merge(state, json.loads(line))
+                except ValueError: #record cut off by interruption, dropped with anything after it
+                    break
+                end += len(line) + 1
+            with open(path, 'r+b') as state_file: #cut off record removed, so new records follow whole ones
+                size = os.path.getsize(path)
+                state_file.truncate(min(end, size))
+                if end > size: #last record without line end
+                    state_file.seek(size)
+                    state_file.write(b'\n')
+            self.state = state
+            print(f'resuming from {path}') #prints to standard output that run is resumed
+        else:
+            with open(path, 'w') as state_file:
+                state_file.write(json.dumps(self.state) + '\n')
+        self.file = open(path, 'a') #journal of records
+
+    def save(self, record=None):
+        with self.lock:
+            self.file.write(json.dumps(record) + '\n')
+            self.file.flush()
+            os.fsync(self.file.fileno()) #record on disk before search goes on
+
+    @classmethod
+    def merge(cls, state=None, record=None):
+        for key, value in record.items():
+            if isinstance(value, dict) and isinstance(state.get(key), dict):
+                cls.merge(state[key], value)
+            else:
+                state[key] = value
+
+checkpoint = None #checkpoint of run progress, None when not used, set from --resume
+
+# Profiler
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # trace:
+        # trace file, every request and stage written to it as a chrome trace event, one per line
+# use:
+    # timers and counters of every E-utilities request, stage and generation of child_find,
+    # requests kept by E-utility and database with number, cached responses, decompressed bytes,
+    # latency from the request sent to its response headers and latency histogram,
+    # time waited for the request scheduler, slept before retries and spent on failed attempts kept apart from latency,
+    # stage times summed over threads, so concurrent stages can add up to more than the run
+# methods:
+    # span:
+        # context manager timing one stage, yielding dictionary of arguments added to its trace event
+    # waiter:
+        # request scheduler wait, timed
+    # request:
+        # records one request, once read to end, streamed responses read while parsed so timed as stream parse
+    # cached:
+        # records one response read from cache
+    # count:
+        # adds to a counter
+    # mark:
+        # time and number of requests, for timing a generation
+    # generation:
+        # records one generation of child_find
+    # event:
+        # writes one trace event
+    # summary:
+        # prints table of requests, latency histograms, stages, generations and counters
+    # close:
+        # ends trace file
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+class Profiler:
+    latency_edges = [10, 25, 50, 100, 250, 500, 1000, 2500] #milliseconds of latency histogram buckets
+
+    def __init__(self, trace=None):
+        self.start = time.perf_counter() #start of profile
+        self.lock = threading.Lock() #lock so threads share timers
+        self.endpoints = {} #E-utility and database and its requests, cached responses, bytes and latencies
+        self.stages = {} #stage and its number and seconds
+        self.counters = {} #counter and its count
+        self.generations = [] #generation, taxa, seconds and requests of child_find generations
+        self.requests = 0 #requests sent to NCBI
+        self.trace = open(trace, 'w') if trace else None
+        if self.trace: #trace events as json array, one event per line
+            self.trace.write('[\n')
+
+    @contextmanager
+    def span(self, name=None, category='stage', **args):
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            end = time.perf_counter()
+            with self.lock:
+                stage = self.stages.setdefault(name, [0, 0.0])
+                stage[0] += 1
+                stage[1] += end - start
+            self.event(name, category, start, end, args)
+
+    def waiter(self, wait=None):
+        def timed_wait():
+            start = time.perf_counter()
+            wait()
+            timed_wait.seconds += time.perf_counter() - start
+        timed_wait.seconds = 0.0 #seconds waited by this request
+        return timed_wait
+
+    def request(self, endpoint=None, start=None, waited=0.0, headers=None, response=None, streamed=False):
+        end = time.perf_counter()
+        latency = headers - response.sent #seconds from request sent to response headers, of attempt answered
+        read = end - headers - response.resent #seconds reading response, without sending request again
+        failed = max(0.0, end - start - waited - response.backoff - latency - read) #seconds of failed attempts, rest of request
+        with self.lock:
+            stats = self.endpoints.setdefault(endpoint, {'requests': 0, 'cached': 0, 'bytes': 0, 'latency': []})
+            stats['requests'] += 1
+            stats['bytes'] += response.size
+            stats['latency'].append(latency)
+            self.requests += 1
+            for name, seconds in (('rate limit wait', waited), ('retry backoff', response.backoff), ('failed attempts', failed),
+                                  ('network latency', latency), ('response read', read)):
+                if streamed and name == 'response read': #read while parsed, timed as stream parse
+                    continue
+                if not response.retried and name in ('retry backoff', 'failed attempts'): #request answered first time
+                    continue
+                stage = self.stages.setdefault(name, [0, 0.0])
+                stage[0] += 1
+                stage[1] += seconds
+        self.event(endpoint, 'request', start, end, {'waited ms': round(waited*1000, 1), 'backoff ms': round(response.backoff*1000, 1),
+                                                     'latency ms': round(latency*1000, 1), 'bytes': response.size})
+
+    def cached(self, endpoint=None):
+        with self.lock:
+            self.endpoints.setdefault(endpoint, {'requests': 0, 'cached': 0, 'bytes': 0, 'latency': []})['cached'] += 1
+
+    def count(self, name=None, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def mark(self):
+        return time.perf_counter(), self.requests
+
+    def generation(self, generation=None, taxa=0, mark=None):
+        end = time.perf_counter()
+        with self.lock:
+            self.generations.append((generation, taxa, end - mark[0], self.requests - mark[1]))
+        self.event(f'generation {generation}', 'generation', mark[0], end, {'taxa': taxa, 'requests': self.requests - mark[1]})
+
+    def event(self, name=None, category=None, start=None, end=None, args=None):
+        if not self.trace:
+            return
+        line = json.dumps({'name': name, 'cat': category, 'ph': 'X', 'ts': round((start - self.start)*1e6, 1),
+                           'dur': round((end - start)*1e6, 1), 'pid': os.getpid(), 'tid': threading.get_ident(), 'args': args or {}})
+        with self.lock:
+            self.trace.write(line + ',\n')
+
+    def summary(self):
+        wall = time.perf_counter() - self.start
+        print(f'\nprofile of run, {wall:.2f} seconds') #prints to standard output profile tables
+        print(f"{'request':<22}{'sent':>8}{'cached':>8}{'MB unzipped':>12}{'mean ms':>9}{'p50 ms':>8}{'p95 ms':>8}{'max ms':>8}")
+        for endpoint, stats in sorted(self.endpoints.items()):
+            latency = sorted(stats['latency']) or [0.0]
+            percentile = lambda fraction: latency[min(len(latency) - 1, int(fraction * len(latency)))] * 1000
+            print(f"{endpoint:<22}{stats['requests']:>8}{stats['cached']:>8}{stats['bytes']/1e6:>12.2f}"
+                  f"{sum(latency)/len(latency)*1000:>9.1f}{percentile(0.5):>8.1f}{percentile(0.95):>8.1f}{latency[-1]*1000:>8.1f}")
+        print(f"\n{'latency histogram':<22}" + ''.join(f"{'<' + str(edge):>7}" for edge in self.latency_edges) + f"{'>=' + str(self.latency_edges[-1]):>7}")
+        for endpoint, stats in sorted(self.endpoints.items()):
+            buckets = [0] * (len(self.latency_edges) + 1)
+            for latency in stats['latency']:
+                buckets[bisect.bisect_right(self.latency_edges, latency * 1000)] += 1
+            print(f'{endpoint:<22}' + ''.join(f'{bucket:>7}' for bucket in buckets))
+        print(f"\n{'stage':<22}{'calls':>8}{'seconds':>10}{'mean ms':>10}")
+        for name, (calls, seconds) in sorted(self.stages.items(), key=lambda stage: -stage[1][1]):
+            print(f'{name:<22}{calls:>8}{seconds:>10.3f}{seconds/calls*1000:>10.1f}')
+        if self.generations:
+            print(f"\n{'generation':<12}{'taxa':>8}{'seconds':>10}{'requests':>10}")
+            for generation, taxa, seconds, requests in self.generations:
+                print(f'{generation:<12}{taxa:>8}{seconds:>10.3f}{requests:>10}')
+        for name, number in sorted(self.counters.items()):
+            print(f'{name}: {number}')
+        #prints to standard output rate achieved, for comparing with NCBI's limit
+        print(f"\n{self.requests/wall:.2f} requests per second sent, limit {request_limit} per second, "
+              f"{self.stages.get('rate limit wait', [0, 0.0])[1]:.2f} seconds waited for request scheduler")
+
+    def close(self):
+        if self.trace: #json array closed, so trace file is valid json
+            self.trace.write(json.dumps({'name': 'end', 'ph': 'i', 's': 'g', 'ts': round((time.perf_counter() - self.start)*1e6, 1),
+                                         'pid': os.getpid(), 'tid': threading.get_ident()}) + '\n]\n')
+            self.trace.close()
+            self.trace = None
+
+profiler = None #timers and counters of run, None when not used, set by TaxonGenomeClient
 
 #functions
 # ----------------------------------------------------------------------------------------
 
+# profile_stage
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # name:
+        # name of stage
+    # args:
+        # arguments added to trace event of stage
+# use:
+    # times a stage of the run when profiling, otherwise does nothing
+# return:
+    # context manager yielding dictionary of arguments of stage
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def profile_stage(name=None, **args):
+    return profiler.span(name, **args) if profiler else nullcontext(args)
+
+# entrez_open
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # url:
+        # NCBI E-utilities base url
+    # query:
+        # database and search terms of url
+    # database:
+        # NCBI database searched, for cache expiry
+    # post:
+        # sends query by POST instead of in url
+    # use_cache:
+        # reads and writes response cache, history server responses are not cached as they expire
+    # stream:
+        # returns url content as a file to be parsed while read, added to cache once read to end,
+        # memory held up to cache_stream_limit, as cached responses are read whole and larger ones are not cached
+    # cache_if:
+        # function of url content, content only added to cache when it returns True
+# use:
+    # reads NCBI E-utilities url from the response cache,
+    # or once the request scheduler allows it, adding the response to the cache
+# return:
+    # entrez_read:
+        # url content, or file of url content when stream flag raised
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def entrez_open(url=None, query=None, database=None, post=False, use_cache=True, stream=False, cache_if=None):
+    query_type = url.split('/')[-1].split('.')[0] #E-utility of url, esearch or efetch
+    use_cache = cache and use_cache #cache used only when available
+    if use_cache: #response read from cache if present
+        entrez_read = cache.get(database, query_type, query)
+        if entrez_read is not None:
+            if profiler:
+                profiler.cached(f'{query_type} {database}')
+            return io.BytesIO(entrez_read) if stream else entrez_read
+    request = query + f"&tool={tool}" #program added to query, as asked by NCBI
+    if email: #email added to query, as asked by NCBI
+        request += f"&email={quote(email)}"
+    if api_key: #api key added to query so the higher request limit applies
+        request += f"&api_key={api_key}"
+    wait = profiler.waiter(scheduler.wait) if profiler else scheduler.wait #request scheduler wait, timed when profiling
+    start = time.perf_counter()
+    if post: #opens the url with connection pool as POST, once request scheduler allows it
+        entrez = http_pool.request(url, data=request.encode(), wait=wait)
+    else: #opens the url with connection pool, once request scheduler allows it
+        entrez = http_pool.request(url + request, wait=wait)
+    if profiler: #request recorded once read to end
+        headers = time.perf_counter()
+        entrez.on_release = lambda response: profiler.request(f'{query_type} {database}', start, wait.seconds, headers, response,
+                                                              streamed=stream)
+    if stream: #url content parsed while read, kept for cache
+        return CacheTee(entrez, database, query_type, query, cache_if) if use_cache else entrez
+    entrez_read = entrez.read()  # reads the url content
+    if use_cache and (cache_if is None or cache_if(entrez_read)): #response added to cache
+        cache.put(database, query_type, query, entrez_read)
+    return entrez_read
+
 # entrez_search
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # input variables:
@@ -110,49 +1372,160 @@ args=parser.parse_args()#parses command line
         #NCBI database to find input_species
     #next_of_kin:
         #finds children taxon on NCBI taxonomy database
+    #retstart:
+        #first id returned, for paging through search
+    #retmax:
+        #number of ids returned
+    #usehistory:
+        #posts search to the history server, returning WebEnv and QueryKey
+    #history:
+        #(WebEnv, QueryKey) of search on the history server, ids read from it instead of searching input_species
+    #fields:
+        #list of elements of interest, pulled out in one pass while the response is read instead of parsing to xml
+    #rettype:
+        #count returns only the number of ids found
+    #dates:
+        #(mindate, maxdate) as YYYY/MM/DD, only ids modified between them found
+    #single_page:
+        #search posted to history server is cached when all its ids fit in the page returned, as its history is then not needed
 # use:
     # parses NCBI database entrez search to xml
 # return:
     # xml_s:
-        # xml parsed url search
+        # xml parsed url search, or dictionary of each field and its list of matches when fields given
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-def entrez_search(input_species=None,database=None,next_of_kin=False):
-    baseurl_search = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi?" # base url for using esearch module against NCBI databases
-    if next_of_kin: #next_of_kin used for displaying children taxa with esearch, database and input species can be manipulated in query
-        query = f"db={database}&term={input_species}[next%20level]&format=xml&RetMax=100000"
+def entrez_search(input_species=None,database=None,next_of_kin=False,retstart=0,retmax=100000,usehistory=False,history=None,fields=None,rettype=None,dates=None,single_page=False):
+    baseurl_search = eutils + "esearch.fcgi?" # base url for using esearch module against NCBI databases
+    if history: #search stored on the history server, referred to by its query key
+        query = f"db={database}&term=%23{history[1]}&WebEnv={history[0]}&usehistory=y&format=xml&RetMax={retmax}"
+    elif next_of_kin: #next_of_kin used for displaying children taxa with esearch, database and input species can be manipulated in query
+        query = f"db={database}&term={input_species}[next%20level]&format=xml&RetMax={retmax}"
     else: #database and input species can be manipulated in query
-        query = f"db={database}&term={input_species}&format=xml&RetMax=100000"
-    url = baseurl_search + query#add to form one url
-    # print(url)
-    entrez_s = urlopen(url)  # opens the url with urlopen module
-    entrez_s_read = entrez_s.read()  # reads the url content
+        query = f"db={database}&term={input_species}&format=xml&RetMax={retmax}"
+    if retstart: #later pages of search
+        query += f"&RetStart={retstart}"
+    if usehistory: #search posted to history server
+        query += "&usehistory=y"
+    if rettype: #only number of ids returned
+        query += f"&rettype={rettype}"
+    if dates: #only ids modified within dates
+        query += f"&datetype=mdat&mindate={dates[0]}&maxdate={dates[1]}"
+    # print(baseurl_search + query)
+    use_cache = single_page or not (usehistory or history) #history server searches expire, so are not cached
+    #search of one page cached, found from Count near start of response
+    cache_if = (lambda content: int(re.search(rb'<Count>(\d+)</Count>', content).group(1)) <= retmax) if single_page else None
+    if fields: #fields pulled out while response read
+        return data_stream(entrez_open(baseurl_search, query, database, use_cache=use_cache, stream=True, cache_if=cache_if), fields)
+    entrez_s_read = entrez_open(baseurl_search, query, database, use_cache=use_cache, cache_if=cache_if)  # reads the url content with entrez_open
     # print(entrez_s)
-    xml_s = etree.XML(entrez_s_read)  # parses the content into xml format
+    with profile_stage('xml parse'):
+        xml_s = etree.XML(entrez_s_read)  # parses the content into xml format
     return xml_s
 
 # entrez_fetch
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # input variables:
     # input_ID:
-        # user input as either taxa(word) or taxid(number)
+        # user input as either taxa(word) or taxid(number), or a list of taxids
     # database:
         # NCBI database to find input_ID
+    # stream:
+        # returns file of response for parsing while read, instead of parsing to xml
 # use:
     # parses NCBI database entrez fetch to xml
 # return:
     # xml_f:
-        # xml parsed url search
+        # xml parsed url search, or file of response when stream flag raised
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-def entrez_fetch(input_ID=None,database=None):
+def entrez_fetch(input_ID=None,database=None,stream=False):
     # print(input_ID)
-    baseurl_fetch = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi?" # base url for using esearch module against NCBI databases
-    query = f"db={database}&id=[{input_ID}]&format=xml&RetMax=100000" #database and input species can be manipulated in query
-    url = baseurl_fetch + query #add to form one url
-    entrez = urlopen(url)  # opens the url with urlopen module
-    entrez_read = entrez.read()  # reads the url content
-    xml_f = etree.XML(entrez_read)  # parses the content into xml format
+    baseurl_fetch = eutils + "efetch.fcgi?" # base url for using esearch module against NCBI databases
+    if isinstance(input_ID, list): #batch of taxids joined into one comma separated id string
+        input_ID = ','.join(input_ID)
+    query = f"db={database}&id={input_ID}&format=xml&RetMax=100000" #database and input species can be manipulated in query
+    post = input_ID.count(',') >= post_limit #long id lists sent by POST, url would otherwise be too long
+    if stream: #response parsed while read
+        return entrez_open(baseurl_fetch, query, database, post, stream=True)
+    entrez_read = entrez_open(baseurl_fetch, query, database, post)  # reads the url content with entrez_open
+    with profile_stage('xml parse'):
+        xml_f = etree.XML(entrez_read)  # parses the content into xml format
     return xml_f
 
+# entrez_summary
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # input_ID:
+        # list of ids
+    # database:
+        # NCBI database to find input_ID
+    # stream:
+        # returns file of response for parsing while read, instead of parsing to xml
+# use:
+    # parses NCBI database entrez summary to xml
+# return:
+    # xml_u:
+        # xml parsed url summary, or file of response when stream flag raised
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def entrez_summary(input_ID=None,database=None,stream=False):
+    baseurl_summary = eutils + "esummary.fcgi?" # base url for using esummary module against NCBI databases
+    input_ID = ','.join(input_ID) #ids joined into one comma separated id string
+    query = f"db={database}&id={input_ID}&format=xml" #database and ids can be manipulated in query
+    post = input_ID.count(',') >= post_limit #long id lists sent by POST, url would otherwise be too long
+    if stream: #response parsed while read
+        return entrez_open(baseurl_summary, query, database, post, stream=True)
+    entrez_read = entrez_open(baseurl_summary, query, database, post)  # reads the url content with entrez_open
+    with profile_stage('xml parse'):
+        xml_u = etree.XML(entrez_read)  # parses the content into xml format
+    return xml_u
+
+# entrez_search_pages
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # input_term:
+        # url formatted search term
+    # database:
+        # NCBI database to search
+    # next_of_kin:
+        # finds children taxon on NCBI taxonomy database
+    # concurrent:
+        # searches pages concurrently, only when not already running in the request scheduler
+    # dates:
+        # (mindate, maxdate) as YYYY/MM/DD, only ids modified between them found
+# use:
+    # pages through NCBI database entrez search, page_size ids at a time,
+    # searches are posted to the history server, and those larger than one page read back from it page by page,
+    # only searches of one page served from the response cache,
+    # at most one page per request scheduler worker held at a time, so memory stays bounded
+# yield:
+    # id_list:
+        # ids of each page, in search order
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def entrez_search_pages(input_term=None,database=None,next_of_kin=False,concurrent=True,dates=None):
+    #first page of search posted to history server, cached only when the search fits in one page
+    data_h = entrez_search(input_term, database, next_of_kin, retmax=page_size, usehistory=True,
+                           fields=['Count', 'QueryKey', 'WebEnv', 'Id'], dates=dates, single_page=True)
+    yield data_h['Id']
+    count = int(data_h['Count'][0]) #total number of ids found
+    if count <= page_size: #search fits in one page
+        return
+    #remaining pages read from the same history server search, so no ids repeated or lost between pages
+    history = (data_h['WebEnv'][0], data_h['QueryKey'][0])
+    pages = (count + page_size - 1) // page_size #total number of pages
+    search_page = lambda retstart: entrez_search(database=database, retstart=retstart, retmax=page_size, history=history, fields=['Id'])['Id']
+    searching = deque() #pages being searched, in search order
+    for page, retstart in enumerate(range(page_size, count, page_size), start=2): #remaining pages
+        if concurrent:
+            searching.append((page, retstart, scheduler.pool.submit(search_page, retstart)))
+        else:
+            searching.append((page, retstart, None))
+        if len(searching) >= scheduler.workers or retstart + page_size >= count: #yields pages once window full or at last page
+            while searching:
+                page_number, page_start, future = searching.popleft()
+                id_list = future.result() if future else search_page(page_start)
+                #prints to standard output search progress
+                print(f"""page {page_number} of {pages} for {input_term.replace('%20', ' ').replace('"', "")}, {min(page_start + page_size, count)} of {count} ids""")
+                yield id_list
+
 # data_find
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # input variables:
@@ -173,7 +1546,8 @@ def entrez_fetch(input_ID=None,database=None):
 def data_find(xml=None,pattern_search=None,tree_build=False,first_data=False):
     data_list=[] #assigned list for pattern matches
     original=False #flag for determining user inputted taxon/taxid
-    pattern_match = xml.xpath(f"//{pattern_search}")  # search for all matches
+    with profile_stage('data_find xpath'):
+        pattern_match = xml.xpath(f"//{pattern_search}")  # search for all matches
     for match in pattern_match: #for loop through pattern_match to convert all elements into text format
         # print(match.text)
         if tree_build:#for lineage list, hold onto user inputted taxon/taxid for appending at end
@@ -191,20 +1565,107 @@ def data_find(xml=None,pattern_search=None,tree_build=False,first_data=False):
         data_list = '\"'+ data_list.replace(" ", "%20") + '\"' # replaces white space with %20 and adds double quotes, so url can be searched
     return data_list
 
+# data_stream
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # source:
+        #file of xml response, from entrez_open with stream flag raised
+    #pattern_search:
+        # list of elements of interest
+# use:
+    # populates lists with all elements of interest in one pass while the response is read,
+    # elements are freed once read so memory does not grow with response size
+# return:
+    # data_dict:
+        #dictionary of each pattern_search element and its list of matches, in document order
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def data_stream(source=None,pattern_search=None):
+    data_dict={pattern: [] for pattern in pattern_search} #assigned lists for pattern matches
+    with profile_stage('stream parse'): #response read and parsed together
+        for event, match in etree.iterparse(source, events=('end',), tag=pattern_search): #for loop through matches as parsed
+            data_dict[match.tag].append(match.text)
+            match.clear() #frees match
+            while match.getprevious() is not None: #frees earlier elements, already read
+                del match.getparent()[0]
+    source.close() #connection returned to pool
+    return data_dict
+
+# taxon_split
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # source:
+        #file of xml response of one or more taxonomy records, from entrez_fetch with stream flag raised
+    # lineage:
+        #adds lineage of each record
+# use:
+    # splits streamed taxonomy xml into taxon, taxonomic rank and taxid of each record,
+    # lineage taxa nested within each record are skipped,
+    # each record freed once read so memory does not grow with number of records
+# return:
+    # records:
+        # list of (taxon, taxonomic rank, taxid) for every record, taxon and rank url formatted,
+        # with lineage as list of taxa when lineage flag raised
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def taxon_split(source=None,lineage=False):
+    records=[] #assigned list for taxonomy records
+    with profile_stage('stream parse'): #response read and parsed together
+        for event, record in etree.iterparse(source, events=('end',), tag='Taxon'): #for loop through taxa as parsed
+            if record.getparent().tag != 'TaxaSet': #top level taxa only, not LineageEx taxa
+                continue
+            taxon = record.findtext('ScientificName') #taxon of record
+            rank = record.findtext('Rank') #taxonomic rank of record
+            taxid = record.findtext('TaxId') #taxid of record
+            #replaces white space with %20 and adds double quotes, as in data_find, so url can be searched
+            if lineage: #lineage of record split into taxa
+                records.append(('\"'+ taxon.replace(" ", "%20") + '\"', '\"'+ rank.replace(" ", "%20") + '\"', taxid,
+                                (record.findtext('Lineage') or '').split('; ')))
+            else:
+                records.append(('\"'+ taxon.replace(" ", "%20") + '\"', '\"'+ rank.replace(" ", "%20") + '\"', taxid))
+            record.clear() #frees record
+            while record.getprevious() is not None: #frees earlier records, already read
+                del record.getparent()[0]
+    source.close() #connection returned to pool
+    return records
+
+# summary_split
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # source:
+        #file of xml response of assembly summaries, from entrez_summary with stream flag raised
+# use:
+    # splits streamed assembly summary xml into genome id and species taxid of each record,
+    # each record freed once read so memory does not grow with number of records
+# return:
+    # records:
+        # list of (genome id, species taxid) for every record
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def summary_split(source=None):
+    records=[] #assigned list for assembly summaries
+    with profile_stage('stream parse'): #response read and parsed together
+        for event, summary in etree.iterparse(source, events=('end',), tag='DocumentSummary'): #for loop through summaries as parsed
+            records.append((summary.get('uid'), summary.findtext('SpeciesTaxid')))
+            summary.clear() #frees summary
+            while summary.getprevious() is not None: #frees earlier summaries, already read
+                del summary.getparent()[0]
+    source.close() #connection returned to pool
+    return records
+
 # taxon_or_taxid
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # input variables:
     # user_input:
         #user input, as list, of either taxa(word) or taxid(number)
+    # quit:
+        #exits script when taxon/taxid not found, otherwise returns None
 # use:
-    # searches database for reciprocal taxid or taxon
+    # searches database for reciprocal taxid or taxon, each user input searched once per run
 # return:
     # species:
         # scientific name of taxon
     # ID:
         # taxid for taxon
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-def taxon_or_taxid(user_input=None):
+def taxon_or_taxid(user_input=None, quit=True):
     species_ID = "" #string variable to be changed to from lost
     for n, element in enumerate(user_input):#changes datatype from list to string
         if n != 0: #adds space between elements in string variable
@@ -212,11 +1673,26 @@ def taxon_or_taxid(user_input=None):
         elif n == 0:
             species_ID=element
     # print(species_ID)
+    if species_ID in resolve_memo: #user input already searched
+        return resolve_memo[species_ID]
+    user_ID = species_ID #user input, before url formatting
     try:  # raises exception if inputted taxon/taxid not in database
-        if re.search('^[\d]+$', species_ID):  # checks if user input is an ID
+        if re.search('^[\d]+$', species_ID) and taxdump:  # checks if user input is an ID, found in taxdump index
+            ID=taxdump.current(species_ID) #change user input to ID, or ID it was merged into
+            if ID is None: #taxid not in taxdump
+                raise IndexError
+            species = taxdump.name(ID) #find taxon name for user input
+            species = '\"'+ species.replace(" ", "%20") + '\"' # replaces white space with %20, and adds double quotes as in data_find
+        elif re.search('^[\d]+$', species_ID):  # checks if user input is an ID
             ID=species_ID #change user input to ID
             xml_f = entrez_fetch(species_ID, 'taxonomy') #create xml of taxid from taxonomy database
             species = data_find(xml_f, 'ScientificName',first_data=True) #find taxon name for user input
+        elif taxdump: # user input is a taxon, found in taxdump index
+            ID = taxdump.lookup(species_ID) #find taxid for user input
+            species_ID = '\"'+ species_ID.replace(" ", "%20") + '\"' ## replaces white space with %20, and adds double quotes so url can be searched
+            species=species_ID #changes user input to taxon
+            if ID is None: #taxon not in taxdump
+                raise IndexError
         elif not re.search('^[\d]+$', species_ID): # checks if user input is a taxon
             species_ID = '\"'+ species_ID.replace(" ", "%20") + '\"' ## replaces white space with %20, and adds double quotes so url can be searched
             species=species_ID #changes user input to taxon
@@ -226,7 +1702,10 @@ def taxon_or_taxid(user_input=None):
         test=species[0]+ ID[0] #checks whether taxon/taxid in database
     except IndexError: # prints to standard output that taxon or taxid inputted was not found in database
         print(f'''{species_ID.replace("%20", " ").replace('"', "")} not found in NCBI taxonomy database or misspelled, please try again''')
+        if not quit: #user input skipped
+            return None
         exit() # exits script
+    resolve_memo[user_ID] = (species, ID)
     return species, ID
 
 # lineage_search
@@ -242,6 +1721,8 @@ def taxon_or_taxid(user_input=None):
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 def lineage_search(user_input=None):
     user_input=taxon_or_taxid(user_input) # searches database for reciprocal taxid or taxon
+    if taxdump: #lineage from taxdump index
+        return taxdump.lineage(user_input[1])
     xml_f=entrez_fetch(user_input[1],'taxonomy') #create xml of taxid from taxonomy database
     lineage=data_find(xml_f,'ScientificName', tree_build=True) #creates list of all taxon in lineage for taxid
     return lineage
@@ -271,18 +1752,29 @@ def lineage_visualisation(lineage=None):
 # input variables:
     #user_input:
         # user input, as list, of either taxa(word) or taxid(number)
+    #sub_species:
+        # keeps taxonomic ranks below species
+    #batch_size:
+        # number of taxids fetched per NCBI request
+    #on_species:
+        # function called with taxon and taxid of each species as soon as it is found
 # use:
     #while loop through each child taxa,
     #adding taxa to generations dictionary
-    # and whether its a species to is_species dictionary
+    # and whether its a species to is_species dictionary,
+    # taxa found in taxdump index instead of NCBI when available,
+    # taxa and children already found this run read from taxon_memo and children_memo,
+    # progress saved to checkpoint after every generation and resumed from it
 # return:
     # generations:
         # nested dictionary of each generation through while loop
         #with nested dictionary having taxon name and respective child taxids
     #is_species:
         #dictionary of taxon name and taxonomic rank
+    #taxid_of:
+        #dictionary of taxon name and taxid
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-def child_find(user_input=None, sub_species=None):
+def child_find(user_input=None, sub_species=None, batch_size=500, on_species=None):
     count =0 #last child taxon counter
     counter = 0 #generation counter
     child_list=[] #list of children taxa
@@ -290,32 +1782,75 @@ def child_find(user_input=None, sub_species=None):
     child_lineage={} #dictionary of taxon and its children taxids
     generations = {} #dictionary of generation and nested child_lineage dictionary
     is_species = {} #dictionary of taxon and taxonomic rank
-    user_input = taxon_or_taxid(user_input) # searches database for reciprocal taxid or taxon
-    child_id_list=[user_input[1]] #pulls out taxid into a list
+    taxid_of = {} #dictionary of taxon and taxid, for finding children in taxdump index
+    progress = checkpoint.state.get('child_find') if checkpoint else None #traversal progress of resumed run
+    if progress: #generations already found read from checkpoint
+        generations = {int(generation): child_lineage for generation, child_lineage in progress['generations'].items()}
+        is_species = progress['is_species']
+        taxid_of = progress['taxid_of']
+        child_id_list = progress['child_id_list']
+        counter = progress['counter']
+        print(f'resuming traversal at generation {counter}') #prints to standard output generation resumed from
+        if on_species: #species already found passed on
+            for taxon, species_limit in is_species.items():
+                if species_limit == '"species"':
+                    on_species(taxon, taxid_of[taxon])
+        if progress['done']: #traversal already finished
+            return generations, is_species, taxid_of
+    else:
+        user_input = taxon_or_taxid(user_input) # searches database for reciprocal taxid or taxon
+        child_id_list=[user_input[1].replace('"', "")] #pulls out taxid into a list, taxid searched for a taxon is url formatted with double quotes
     # print(user_input)
     while 1: #while loop that breaks when no next children taxa exists
-        for ID in child_id_list: #for every taxid
-            xml_f = entrez_fetch(ID, 'taxonomy') #create xml of taxid from taxonomy database
-            taxon = data_find(xml_f, 'ScientificName',first_data=True) #finds taxon from xml
-            species_limit = data_find(xml_f, 'Rank',first_data=True) #finds taxonomic rank from xml
-            #prints to standard output taxon and taxonomic rank
-            print(f'''{taxon.replace("%20", " ").replace('"', "")} is of rank {species_limit.replace("%20", " ").replace('"', "")}''')
-            is_species[taxon]=species_limit #adds taxon and taxonomic rank to is_species dictionary
-            if sub_species: # if sub_species flag raised keeps taxonomic rank below species
-                child_list.append(taxon)#adds taxon to taxon list, which will be for looping through later to determine taxids
-            elif not sub_species: #if not sub_species flag raised keeps taxonomic rank below species
-                if species_limit == '"species"':
-                    child_lineage[taxon]=[] #removes ranks below species
-                elif not species_limit == '"species"':
-                    child_list.append(taxon) #adds taxon to taxon list, which will be for looping through later to determine taxids
+        generation_mark = profiler.mark() if profiler else None #start of generation, when profiling
+        new_taxa = [] #taxa found this generation
+        if taxdump: #records of taxids from taxdump index
+            batch_records = [taxdump.records(child_id_list)]
+        else: #records of taxids not already fetched this run
+            missing = [ID for ID in child_id_list if ID not in taxon_memo]
+            batches = [missing[start:start+batch_size] for start in range(0, len(missing), batch_size)] #batches of taxids
+            #create xml of every taxid batch from taxonomy database concurrently, and split into records
+            with profile_stage('taxonomy fetch', generation=counter, taxids=len(missing)):
+                fetched = [record for records in scheduler.map(lambda batch: taxon_split(entrez_fetch(batch, 'taxonomy', stream=True)), batches)
+                           for record in records]
+            for record in fetched:
+                taxon_memo[record[2]] = record
+            requested = set(child_id_list)
+            #records in taxid order, with records returned under another taxid (merged taxids) at end
+            batch_records = [[taxon_memo[ID] for ID in child_id_list if ID in taxon_memo] +
+                             [record for record in fetched if record[2] not in requested]]
+        for records in batch_records: #for every batch of taxids
+            for taxon, species_limit, taxid in records: #finds taxon and taxonomic rank of each record from xml
+                #prints to standard output taxon and taxonomic rank
+                print(f'''{taxon.replace("%20", " ").replace('"', "")} is of rank {species_limit.replace("%20", " ").replace('"', "")}''')
+                is_species[taxon]=species_limit #adds taxon and taxonomic rank to is_species dictionary
+                taxid_of[taxon]=taxid #adds taxon and taxid to taxid_of dictionary
+                new_taxa.append(taxon) #taxon found this generation, for checkpoint
+                if on_species and species_limit == '"species"': #species passed on as soon as found
+                    on_species(taxon, taxid)
+                if sub_species: # if sub_species flag raised keeps taxonomic rank below species
+                    child_list.append(taxon)#adds taxon to taxon list, which will be for looping through later to determine taxids
+                elif not sub_species: #if not sub_species flag raised keeps taxonomic rank below species
+                    if species_limit == '"species"':
+                        child_lineage[taxon]=[] #removes ranks below species
+                    elif not species_limit == '"species"':
+                        child_list.append(taxon) #adds taxon to taxon list, which will be for looping through later to determine taxids
         #fix this too
         if '"environmental%20samples"' in child_list: #does not loop through environmental samples
             child_list.remove('"environmental%20samples"')
         # print(child_list)
-        for ID in child_list: #for loop through all newly determined taxons to pull out taxids
+        if taxdump: #children taxids from taxdump index
+            data_lists = [taxdump.children(taxid_of[ID]) for ID in child_list]
+        else: #create xml of next of kin taxids from taxonomy database concurrently, for taxa not already searched, and find taxids from xml
+            missing = [ID for ID in child_list if taxid_of[ID] not in children_memo]
+            with profile_stage('children search', generation=counter, taxa=len(missing)):
+                searched = scheduler.map(lambda ID: [taxid for page in entrez_search_pages(ID, 'taxonomy', next_of_kin=True, concurrent=False)
+                                                     for taxid in page], missing)
+            for ID, data_list in zip(missing, searched):
+                children_memo[taxid_of[ID]] = data_list
+            data_lists = [children_memo[taxid_of[ID]] for ID in child_list]
+        for ID, data_list in zip(child_list, data_lists): #for loop through all newly determined taxons to pull out taxids
             # print(ID)
-            xml_s = entrez_search(ID, 'taxonomy', next_of_kin=True) #create xml of next of kin taxids from taxonomy database
-            data_list = data_find(xml_s, 'Id') #finds taxid from xml
             #is this needed
             for n in data_list: #creates new list with children taxids
                 grandchild_id_list.append(n)
@@ -326,6 +1861,15 @@ def child_find(user_input=None, sub_species=None):
             count+=1
         print(f'found {len(grandchild_id_list)} children taxon') #prints to standard output how many taxa in next generation
         generations[counter] = child_lineage #child_lineage added to generations dictionary along with current generation
+        if profiler: #time and requests of generation
+            profiler.generation(counter, len(child_id_list), generation_mark)
+        if checkpoint: #progress of generation saved, with next generation's taxids
+            checkpoint.state['child_find'] = {'generations': generations, 'is_species': is_species, 'taxid_of': taxid_of,
+                                              'child_id_list': grandchild_id_list, 'counter': counter + 1, 'done': count >= 1}
+            checkpoint.save({'child_find': {'generations': {counter: child_lineage},
+                                            'is_species': {taxon: is_species[taxon] for taxon in new_taxa},
+                                            'taxid_of': {taxon: taxid_of[taxon] for taxon in new_taxa},
+                                            'child_id_list': grandchild_id_list, 'counter': counter + 1, 'done': count >= 1}})
         # if count == len(child_id_list): #break if no next generation
         if count >= 1: #break if no next generation
             break
@@ -335,7 +1879,7 @@ def child_find(user_input=None, sub_species=None):
         grandchild_id_list = [] #reset grandchild_list
         child_lineage={} #reset child_lineage
         counter += 1 #set up next generation number
-    return generations, is_species
+    return generations, is_species, taxid_of
 
 # species_find
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -361,43 +1905,403 @@ def species_find(generations=None,is_species=None):
     #print(species_list)
     return species_list
 
+# subtree_find
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    #user_input:
+        # user input, as list, of either taxa(word) or taxid(number)
+    #sub_species:
+        # keeps taxonomic ranks below species
+    #batch_size:
+        # number of taxids fetched per NCBI request
+# use:
+    # finds all species below taxon of interest with one paged NCBI taxonomy subtree search,
+    # instead of searching each generation of children taxa as child_find,
+    # taxa below environmental samples are removed, as in child_find,
+    # records already fetched this run read from lineage_memo
+# return:
+    # ID:
+        # taxid of taxon of interest
+    # species_list:
+        # list of user specificied species
+    #taxid_of:
+        #dictionary of taxon name and taxid
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def subtree_find(user_input=None, sub_species=None, batch_size=500):
+    species_list=[] #preparing list of species
+    taxid_of = {} #dictionary of taxon and taxid
+    species, ID = taxon_or_taxid(user_input) # searches database for reciprocal taxid or taxon
+    ID = ID.replace('"', "") #taxid searched for a taxon is url formatted with double quotes
+    ranks = ['species'] + (sub_species_ranks if sub_species else []) #taxonomic ranks searched
+    term = f"txid{ID}[Subtree]%20AND%20(" + '%20OR%20'.join(f'{rank}[Rank]' for rank in ranks) + ")" #subtree search term
+    for id_list in entrez_search_pages(term, 'taxonomy'): #taxids of all species below taxon, a page at a time
+        missing = [ID for ID in id_list if ID not in lineage_memo] #taxids not already fetched this run
+        batches = [missing[start:start+batch_size] for start in range(0, len(missing), batch_size)] #batches of taxids
+        #create xml of every taxid batch from taxonomy database concurrently, and split into records
+        with profile_stage('taxonomy fetch', taxids=len(missing)):
+            fetched = [record for records in scheduler.map(lambda batch: taxon_split(entrez_fetch(batch, 'taxonomy', stream=True), lineage=True), batches)
+                       for record in records]
+        for record in fetched:
+            lineage_memo[record[2]] = record
+            taxon_memo[record[2]] = record[:3] #record shared with child_find
+        requested = set(id_list)
+        #records in taxid order, with records returned under another taxid (merged taxids) at end
+        batch_records = [[lineage_memo[ID] for ID in id_list if ID in lineage_memo] +
+                         [record for record in fetched if record[2] not in requested]]
+        for records in batch_records:
+            for taxon, species_limit, taxid, lineage in records:
+                if 'environmental samples' in lineage: #does not keep environmental samples
+                    continue
+                #prints to standard output taxon and taxonomic rank
+                print(f'''{taxon.replace("%20", " ").replace('"', "")} is of rank {species_limit.replace("%20", " ").replace('"', "")}''')
+                taxid_of[taxon]=taxid #adds taxon and taxid to taxid_of dictionary
+                if species_limit == '"species"':
+                    species_list.append(taxon) #add to list
+    print(f'found {len(species_list)} species') #prints to standard output how many species below taxon
+    return ID, species_list, taxid_of
+
+# genome_search
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # species:
+        # species of interest to user
+    # taxid:
+        # taxid of species, needed for assembly index
+    # count_only:
+        # finds only the number of genomes, NCBI returning only the Count element
+# use:
+    # finds assembled genome ids of one species, from assembly index when available
+    # otherwise from NCBI assembly database, each species searched once per run,
+    # species of previous output file only searched for genomes added or modified since previous run
+# return:
+    # genomes:
+        # list of genome ids, or number of genomes when count_only flag raised
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def genome_search(species=None, taxid=None, count_only=False):
+    if count_only and species in count_memo: #species already counted
+        return count_memo[species]
+    if species in genome_memo: #species already searched
+        return len(genome_memo[species]) if count_only else genome_memo[species]
+    if count_only and assemblies: #number of genome assembly accessions from assembly index
+        return assemblies.count(taxid)
+    if count_only: #number of genome assembly ids from asembly database, no ids downloaded
+        count = int(entrez_search(species, 'assembly', retmax=0, fields=['Count'], rettype='count')['Count'][0])
+        count_memo[species] = count
+        return count
+    if assemblies: #genome assembly accessions from assembly index
+        return assemblies.lookup(taxid)
+    if species in previous_genomes: #genome assembly ids added or modified since previous run, merged into previous genomes
+        genomes = genome_merge([genome for page in entrez_search_pages(species, 'assembly', concurrent=False, dates=update_window) for genome in page],
+                               previous_genomes[species])
+        genome_memo[species] = genomes
+        return genomes
+    #create xml of genome assembly ids from asembly database, and pull out genomes
+    genomes = [genome for page in entrez_search_pages(species, 'assembly', concurrent=False) for genome in page]
+    genome_memo[species] = genomes
+    return genomes
+
+# genome_merge
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # new_genomes:
+        # list of genome ids added or modified since previous run
+    # old_genomes:
+        # list of genome ids of previous run
+# use:
+    # merges new genome ids into genome ids of previous run, new ids first as in NCBI search order,
+    # modified ids already in previous run kept once
+# return:
+    # genomes:
+        # list of genome ids
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def genome_merge(new_genomes=None, old_genomes=None):
+    new_set = set(new_genomes) #genome ids found since previous run
+    return new_genomes + [genome for genome in old_genomes if genome not in new_set]
+
 # assembled_genome_find
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # input variables:
     # species_list:
         # list of species of interest to user
+    # taxid_of:
+        # dictionary of taxon name and taxid, needed for assembly index
+    # count_only:
+        # finds only the number of genomes of each species
+# use:
+    # displays number of assmebled genomes for each species in species_list,
+    # genome ids are assembly accessions when found in assembly index,
+    # progress saved to checkpoint after every checkpoint_batch species and resumed from it
+# return:
+    # genome_dict:
+        # a dictionary of each species and a list of all genome ids,
+        # or number of genomes when count_only flag raised
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def assembled_genome_find(species_list=None, taxid_of=None, count_only=False):
+    genome_dict={}#assembled genomes for each species
+    found = checkpoint.state.setdefault('genomes', {}) if checkpoint else {} #assembled genomes of species already searched
+    remaining = [species for species in species_list if species not in found] #species still to be searched
+    for species in species_list: #species read from checkpoint
+        if species in found:
+            print(f"""number of assembled genomes for {species.replace('%20', ' ').replace('"', "")} is {found[species] if count_only else len(found[species])}""")
+    for start in range(0, len(remaining), checkpoint_batch): #for every batch of species
+        batch = remaining[start:start+checkpoint_batch]
+        with profile_stage('assembly search', species=len(batch)):
+            genome_lists=scheduler.map(lambda species: genome_search(species, taxid_of[species], count_only), batch) #genomes of species concurrently
+        for species, genomes in zip(batch, genome_lists): #for loop through species
+            # print(species)
+            # print(f"""number of assembled genomes for {species_ID[0].replace('%20', ' ').replace('"', "")} is {len(genomes)}""")
+            #print to standard output species and number of genomes
+            print(f"""number of assembled genomes for {species.replace('%20', ' ').replace('"', "")} is {genomes if count_only else len(genomes)}""")
+            found[species]=genomes#add genome list to each species
+        if checkpoint: #genomes of batch saved
+            checkpoint.save({'genomes': {species: found[species] for species in batch}})
+    for species in species_list: #genome lists in species order
+        genome_dict[species]=found[species]
+    return genome_dict
+
+# subtree_genome_find
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # ID:
+        # taxid of taxon of interest
+    # species_list:
+        # list of species of interest to user
+    # taxid_of:
+        # dictionary of taxon name and taxid
+    # batch_size:
+        # number of assembly ids summarised per NCBI request
 # use:
-    # displays number of assmebled genomes for each species in species_list
+    # finds assembled genomes of all species below taxon of interest with one paged NCBI assembly search,
+    # each assembly assigned to its species by species taxid from assembly summaries,
+    # displays number of assmebled genomes for each species in species_list,
+    # when updating previous output file only assemblies added or modified since previous run searched,
+    # species new since previous run searched in full,
+    # no assembly search when every species already searched this run, genomes read from genome_memo
 # return:
     # genome_dict:
-        # a dictionary of each species and a list of all genome ids 
+        # a dictionary of each species and a list of all genome ids
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-def assembled_genome_find(species_list=None):
+def subtree_genome_find(ID=None, species_list=None, taxid_of=None, batch_size=500):
     genome_dict={}#assembled genomes for each species
+    species_genomes = {} #dictionary of species taxid and genome ids
+    if all(species in genome_memo for species in species_list): #every species already searched, by an overlapping taxon
+        for species in species_list:
+            print(f"""number of assembled genomes for {species.replace('%20', ' ').replace('"', "")} is {len(genome_memo[species])}""")
+            genome_dict[species]=genome_memo[species]
+        return genome_dict
+    #genome assembly ids of all taxa below taxon, a page at a time, added or modified since previous run when updating
+    for id_list in entrez_search_pages(f"txid{ID}[Organism:exp]", 'assembly', dates=update_window):
+        batches = [id_list[start:start+batch_size] for start in range(0, len(id_list), batch_size)] #batches of genome ids
+        #genome id and species taxid of every genome id batch summary from assembly database concurrently
+        with profile_stage('assembly summary', ids=len(id_list)):
+            batch_summaries = scheduler.map(lambda batch: summary_split(entrez_summary(batch, 'assembly', stream=True)), batches)
+        for summaries in batch_summaries:
+            for genome, species_taxid in summaries: #each genome assembly summary
+                species_genomes.setdefault(species_taxid, []).append(genome)
     for species in species_list: #for loop through species
-        list_species=[species]
-        # print(species)
-        # species_ID=taxon_or_taxid(list_species)
-        # print(species_ID)
-        xml_s=entrez_search(species,'assembly') #create xml of genome assembly ids from asembly database
-        # xml_s=entrez_search(species_ID[0],'assembly')
-        genomes=data_find(xml_s,'Id') #pull out genomes
-        # print(xml_s)
-        # print(f"""number of assembled genomes for {species_ID[0].replace('%20', ' ').replace('"', "")} is {len(genomes)}""")
+        genomes = species_genomes.get(taxid_of[species], [])
+        if species in previous_genomes: #genomes of previous run merged in
+            genomes = genome_merge(genomes, previous_genomes[species])
+        elif update_window: #species new since previous run, all its genomes searched
+            genomes = genome_search(species, taxid_of[species])
+        genome_memo[species] = genomes #genomes shared with overlapping taxa
         #print to standard output species and number of genomes
         print(f"""number of assembled genomes for {species.replace('%20', ' ').replace('"', "")} is {len(genomes)}""")
         genome_dict[species]=genomes#add genome list to each species
     return genome_dict
 
+# pipeline_find
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    #user_input:
+        # user input, as list, of either taxa(word) or taxid(number)
+    #sub_species:
+        # keeps taxonomic ranks below species
+    #batch_size:
+        # number of taxids fetched per NCBI request
+    #count_only:
+        # finds only the number of genomes of each species
+# use:
+    # searches assembled genomes of each species as soon as child_find finds it,
+    # in a thread pool of its own so the taxonomy and assembly searches run side by side,
+    # sharing the request scheduler's rate limit, results printed as they complete,
+    # progress saved to checkpoint every checkpoint_batch species and resumed from it
+# return:
+    # genome_dict:
+        # a dictionary of each species and a list of all genome ids,
+        # or number of genomes when count_only flag raised
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def pipeline_find(user_input=None, sub_species=None, batch_size=500, count_only=False):
+    genome_dict={}#assembled genomes for each species
+    found = checkpoint.state.setdefault('genomes', {}) if checkpoint else {} #assembled genomes of species already searched
+    unsaved = {} #genomes of species found since checkpoint last saved
+    lock = threading.Lock() #lock so found and unsaved not changed while checkpoint saved
+    searching = [] #species and their assembly searches, in order found
+    queued = set() #species already queued for assembly search
+
+    def species_search(species, taxid): #searches genomes of species, printing result once complete
+        with profile_stage('assembly search', species=1):
+            genomes = genome_search(species, taxid, count_only)
+        with lock:
+            found[species] = genomes
+            unsaved[species] = genomes
+        print(f"""number of assembled genomes for {species.replace('%20', ' ').replace('"', "")} is {genomes if count_only else len(genomes)}""")
+
+    with ThreadPoolExecutor(max_workers=scheduler.workers) as consumer: #thread pool for assembly searches
+        def on_species(species, taxid): #species from child_find queued for assembly search
+            if species in found: #species read from checkpoint
+                print(f"""number of assembled genomes for {species.replace('%20', ' ').replace('"', "")} is {found[species] if count_only else len(found[species])}""")
+            elif species not in queued:
+                queued.add(species)
+                searching.append((species, consumer.submit(species_search, species, taxid)))
+        #three dictionaries created from child_find function, species searched while found
+        generations, is_species, taxid_of = child_find(user_input, sub_species, batch_size, on_species)
+        for n, (species, future) in enumerate(searching, start=1): #waits for remaining assembly searches
+            future.result()
+            if checkpoint and n % checkpoint_batch == 0: #genomes of batch saved
+                with lock:
+                    record = {'genomes': dict(unsaved)}
+                    unsaved.clear()
+                checkpoint.save(record)
+    if checkpoint and unsaved: #genomes of last batch saved
+        checkpoint.save({'genomes': unsaved})
+    for species in species_find(generations, is_species): #genome lists in species order
+        genome_dict[species]=found[species]
+    return genome_dict
+
+# genome_find
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    #user_input:
+        # user input, as list, of either taxa(word) or taxid(number)
+    #sub_species:
+        # keeps taxonomic ranks below species
+    #batch_size:
+        # number of taxids fetched per NCBI request
+    #mode:
+        # traversal or subtree
+    #pipeline:
+        # searches assemblies of each species as soon as found, in traversal mode
+    #count_only:
+        # finds only the number of genomes of each species
+# use:
+    # finds assembled genomes of all species below one taxon of interest, in the mode chosen by user
+# return:
+    # genome_dict:
+        # a dictionary of each species and a list of all genome ids,
+        # or number of genomes when count_only flag raised
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def genome_find(user_input=None, sub_species=None, batch_size=500, mode='traversal', pipeline=False, count_only=False):
+    if mode == 'subtree' and not taxdump: #species found with one subtree search, taxdump index already offline
+        subtree = subtree_find(user_input, sub_species, batch_size)
+        species_list = subtree[1]
+        if assemblies or count_only: #number of assembled genomes from assembly index, or counted for each species, printed out
+            return assembled_genome_find(species_list, subtree[2], count_only)
+        #number of assembled genomes from one assembly search printed out for each species
+        return subtree_genome_find(subtree[0], species_list, subtree[2], batch_size)
+    if pipeline: #number of assembled genomes printed out for each species as soon as found
+        return pipeline_find(user_input, sub_species, batch_size, count_only)
+    #three dictionaries created from child_find function
+    generations_and_species = child_find(user_input, sub_species, batch_size)
+    # print(is_species)
+    #dictionaries looped through to output species_list
+    species_list=species_find(generations_and_species[0],generations_and_species[1])
+    #number of assembled genomes printed out for each species
+    return assembled_genome_find(species_list, generations_and_species[2], count_only)
+
+# batch_find
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    #input_file:
+        # file of taxa or taxids, one per line, blank lines and lines starting with # skipped
+    #sub_species:
+        # keeps taxonomic ranks below species
+    #batch_size:
+        # number of taxids fetched per NCBI request
+    #mode:
+        # traversal or subtree
+    #pipeline:
+        # searches assemblies of each species as soon as found, in traversal mode
+    #count_only:
+        # finds only the number of genomes of each species
+# use:
+    # finds assembled genomes for every taxon or taxid in input file,
+    # all inputs searched concurrently in taxonomy database first, inputs not found skipped,
+    # then each taxon searched with genome_find, taxa and species shared by
+    # overlapping taxa read from memos, so each is searched only once
+# return:
+    # batch_dict:
+        # a dictionary of each input and its genome_dict
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def batch_find(input_file=None, sub_species=None, batch_size=500, mode='traversal', pipeline=False, count_only=False):
+    batch_dict={} #genomes of each input
+    with open(input_file) as inputs:
+        queries = [line.strip() for line in inputs if line.strip() and not line.startswith('#')]
+    resolved = scheduler.map(lambda query: taxon_or_taxid(query.split(), quit=False), queries) #all inputs searched at once
+    for query, taxon in zip(queries, resolved):
+        if taxon is None: #input not found
+            continue
+        print(f'searching {query}') #prints to standard output input being searched
+        batch_dict[query] = genome_find(query.split(), sub_species, batch_size, mode, pipeline, count_only)
+    #prints to standard output number of unique taxa and species searched
+    print(f'searched {len(taxon_memo)} unique taxa and {len(count_memo if count_only else genome_memo)} unique species for {len(batch_dict)} inputs')
+    return batch_dict
+
+# output_name
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    #outputfile:
+        # name of output file
+    #query:
+        # taxon or taxid of input file
+# use:
+    # output file name of one taxon of an input file, taxon added before file extension
+# return:
+    # name of taxon output file
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def output_name(outputfile=None, query=None):
+    root, extension = os.path.splitext(outputfile)
+    return f"{root}_{re.sub('[^A-Za-z0-9]+', '_', query).strip('_')}{extension}"
+
+# output_read
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    #outputfile:
+        # name of output file of a previous run
+# use:
+    # reads species and genome ids of a previous output file, as written by print_to_output,
+    # genome id lines are NCBI assembly ids or assembly accessions, every other line a species
+# return:
+    # genome_dict:
+        # a dictionary of each species, url formatted, and a list of its genome ids
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def output_read(outputfile=None):
+    genome_dict={} #genomes of each species of previous run
+    genomes = [] #genomes of species being read
+    with open(outputfile) as output:
+        for line in output:
+            line = line.strip()
+            if not line:
+                continue
+            if re.fullmatch(r'\d+|GC[AF]_\d+\.\d+', line): #genome id of species being read
+                genomes.append(line)
+            elif '\t' in line: #prints to standard output that output file holds only numbers of genomes, exits script
+                print(f'{outputfile} holds only numbers of assembled genomes, genome ids are needed to update it')
+                exit()
+            else: #replaces white space with %20 and adds double quotes, as in data_find
+                genomes = genome_dict.setdefault('\"'+ line.replace(" ", "%20") + '\"', [])
+    return genome_dict
+
 # print_to_output
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # input variables:
     # genone_id_dict:
-        # a dictionary of each species and a list of all genome ids 
+        # a dictionary of each species and a list of all genome ids, or number of genomes
     #outputfile:
         # name of output file
 # use:
-    # when outputfile specified creates an output file of all species and the genome ids
+    # when outputfile specified creates an output file of all species and the genome ids,
+    # or of each species and its number of genomes, tab separated, when only counted
 # return:
     # no return
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -406,6 +2310,9 @@ def print_to_output(genome_id_dict=None,outputfile=None):
         output = open(outputfile, 'w') # opening outputfile
         for species,ID_list in genome_id_dict.items():
             # print(species.replace('%20', ' ').replace('"', ""))
+            if isinstance(ID_list, int): #only number of genomes found
+                print(species.replace('%20', ' ').replace('"', ""), ID_list, sep='\t', file=output)
+                continue
             print(species.replace('%20', ' ').replace('"', ""), file=output)
             for ID in ID_list:
                 # print(ID)
@@ -415,14 +2322,311 @@ def print_to_output(genome_id_dict=None,outputfile=None):
     except TypeError:
         pass
 
+#client and query service
+# ----------------------------------------------------------------------------------------
+
+# TaxonGenomeClient
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # email:
+        # email NCBI asks for to access its databases, left out of requests when None
+    # api_key:
+        # NCBI api key, allows 10 instead of 3 requests per second
+    # threads:
+        # number of concurrent NCBI requests (default requests per second limit)
+    # cache:
+        # response cache file, None turns the cache off
+    # cache_size:
+        # response cache size limit in MB
+    # refresh:
+        # ignores cached responses, replacing them with new ones
+    # taxdump:
+        # folder of NCBI taxdump nodes.dmp and names.dmp, taxonomy searched offline
+    # assembly_summary:
+        # NCBI assembly_summary file, assemblies searched offline
+    # page_size:
+        # number of ids per page of NCBI searches
+    # timeout:
+        # seconds waited for NCBI to answer a request
+    # retries:
+        # number of retries of throttled or failed NCBI requests
+    # batch_size, sub_species, mode, pipeline:
+        # default options of every query, as command line options of the same name
+    # eutils_url:
+        # base url of E-utilities, for a local mirror or mock server (default NCBI)
+    # profile:
+        # times every request, stage and generation, summary printed with profiler.summary()
+    # trace:
+        # trace file of every request and stage, profiling turned on
+    # rate:
+        # requests allowed per second, for a local mirror or mock server (default NCBI's limit, 10 with api key or 3)
+# use:
+    # importable interface to the search functions, the command line and query service both use it,
+    # sets up the request scheduler, connection pool, response cache and offline indexes shared by all search functions,
+    # so one client per process, a second client refused until the first is closed,
+    # taxa and genomes kept in memos between queries,
+    # taxonomy memos cleared once older than taxonomy responses are cached for, and genome memos as assembly responses,
+    # only while no query is running, so concurrent queries of the query service never see memos cleared part way,
+    # taxa returned as scientific names and taxids as numbers in strings
+# methods:
+    # expire:
+        # clears memos older than their responses are cached for
+    # query:
+        # context manager of one query, memos expired before it once no other query is running
+    # close:
+        # closes the shared request scheduler, connection pool, response cache, offline indexes and profiler, and clears memos
+    # resolve:
+        # (scientific name, taxid) of user input, None when not found
+    # descendants:
+        # dictionary of user input and every taxon below it and its taxid, None when not found
+    # species:
+        # list of species below user input, None when not found
+    # assemblies:
+        # dictionary of each species below user input and its genome ids, or number of genomes when count_only flag raised,
+        # None when not found
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+class TaxonGenomeClient:
+    active = None #client whose shared objects are set up, one per process
+
+    def __init__(self, email=None, api_key=None, threads=None, cache=cache_path, cache_size=500, refresh=False,
+                 taxdump=None, assembly_summary=None, page_size=10000, timeout=60, retries=5,
+                 batch_size=500, sub_species=False, mode='traversal', pipeline=False,
+                 eutils_url='https://eutils.ncbi.nlm.nih.gov/entrez/eutils/', profile=False, trace=None, rate=None):
+        if TaxonGenomeClient.active: #shared objects of open client would be replaced
+            raise RuntimeError('a TaxonGenomeClient is already open in this process, close it before creating another')
+        rate = rate or (10 if api_key else 3) #NCBI requests allowed per second
+        #module settings and shared objects read by all search functions
+        globals().update(email=email, api_key=api_key, page_size=page_size, request_limit=rate, eutils=eutils_url,
+                         scheduler=RequestScheduler(rate, threads),
+                         http_pool=ConnectionPool(timeout, retries),
+                         cache=ResponseCache(cache, cache_size*1024*1024, refresh) if cache else None,
+                         taxdump=TaxdumpIndex.open(taxdump) if taxdump else None,
+                         assemblies=AssemblyIndex.open(assembly_summary) if assembly_summary else None,
+                         profiler=Profiler(trace) if profile or trace else None)
+        self.batch_size = batch_size
+        self.sub_species = sub_species
+        self.mode = mode
+        self.pipeline = pipeline
+        self.memo_time = time.time() #time genome memos were last cleared
+        self.taxonomy_time = time.time() #time taxonomy memos were last cleared
+        self.condition = threading.Condition() #condition so memos are only cleared while no query is running
+        self.running = 0 #queries running
+        self.expiring = False #whether memos are being cleared, new queries wait
+        TaxonGenomeClient.active = self
+
+    def expire(self):
+        if time.time() - self.taxonomy_time > cache_ttl['taxonomy']: #taxonomy memos cleared, as cached taxonomy responses expire
+            resolve_memo.clear()
+            taxon_memo.clear()
+            children_memo.clear()
+            lineage_memo.clear()
+            self.taxonomy_time = time.time()
+        if time.time() - self.memo_time > cache_ttl['assembly']: #genome memos cleared, as cached assembly responses expire
+            genome_memo.clear()
+            count_memo.clear()
+            self.memo_time = time.time()
+
+    @contextmanager
+    def query(self):
+        with self.condition:
+            self.condition.wait_for(lambda: not self.expiring) #new queries wait while memos cleared
+            if time.time() - min(self.taxonomy_time, self.memo_time) > min(cache_ttl['taxonomy'], cache_ttl['assembly']):
+                self.expiring = True
+                self.condition.wait_for(lambda: self.running == 0) #memos cleared once no query reads them
+                self.expire()
+                self.expiring = False
+                self.condition.notify_all()
+            self.running += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.running -= 1
+                self.condition.notify_all()
+
+    def resolve(self, user_input=None):
+        with self.query():
+            user_input = user_input.split() if isinstance(user_input, str) else user_input #user input as list, as from command line
+            found = taxon_or_taxid(user_input, quit=False)
+            if found is None: #taxon or taxid not found
+                return None
+            ID = found[1].replace('"', "")
+            if re.search('^[\d]+$', ' '.join(user_input)): #taxid input, taxon found is its scientific name
+                species = found[0]
+            elif taxdump: #taxon input, which may be a common name, scientific name from taxdump index
+                species = taxdump.name(ID)
+            elif ID in taxon_memo: #scientific name of taxid already fetched this run
+                species = taxon_memo[ID][0]
+            else: #scientific name fetched from taxonomy database
+                species = data_find(entrez_fetch(ID, 'taxonomy'), 'ScientificName', first_data=True)
+            return species.replace('%20', ' ').replace('"', ""), ID
+
+    def descendants(self, user_input=None, sub_species=None):
+        with self.query():
+            user_input = user_input.split() if isinstance(user_input, str) else user_input
+            if taxon_or_taxid(user_input, quit=False) is None: #taxon or taxid not found
+                return None
+            sub_species = self.sub_species if sub_species is None else sub_species
+            taxid_of = child_find(user_input, sub_species, self.batch_size)[2] #every taxon found and its taxid
+            return {taxon.replace('%20', ' ').replace('"', ""): taxid.replace('"', "") for taxon, taxid in taxid_of.items()}
+
+    def species(self, user_input=None, sub_species=None, mode=None):
+        with self.query():
+            user_input = user_input.split() if isinstance(user_input, str) else user_input
+            if taxon_or_taxid(user_input, quit=False) is None: #taxon or taxid not found
+                return None
+            sub_species = self.sub_species if sub_species is None else sub_species
+            if (mode or self.mode) == 'subtree' and not taxdump: #species found with one subtree search
+                species_list = subtree_find(user_input, sub_species, self.batch_size)[1]
+            else:
+                species_list = species_find(*child_find(user_input, sub_species, self.batch_size)[:2])
+            return [species.replace('%20', ' ').replace('"', "") for species in species_list]
+
+    def assemblies(self, user_input=None, sub_species=None, mode=None, pipeline=None, count_only=False):
+        with self.query():
+            user_input = user_input.split() if isinstance(user_input, str) else user_input
+            if taxon_or_taxid(user_input, quit=False) is None: #taxon or taxid not found
+                return None
+            sub_species = self.sub_species if sub_species is None else sub_species
+            pipeline = self.pipeline if pipeline is None else pipeline
+            genome_dict = genome_find(user_input, sub_species, self.batch_size, mode or self.mode, pipeline, count_only)
+            return {species.replace('%20', ' ').replace('"', ""): genomes for species, genomes in genome_dict.items()}
+
+    def close(self):
+        if TaxonGenomeClient.active is not self: #already closed
+            return
+        for shared in (scheduler, http_pool, cache, taxdump, assemblies, profiler):
+            if shared:
+                shared.close()
+        globals().update(cache=None, taxdump=None, assemblies=None, profiler=None)
+        for memo in (resolve_memo, taxon_memo, children_memo, lineage_memo, genome_memo, count_memo): #memos of this client's settings
+            memo.clear()
+        TaxonGenomeClient.active = None
+
+# QueryHandler
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # client:
+        # TaxonGenomeClient answering queries, set by serve
+# use:
+    # HTTP/JSON request handler of the query service,
+    # GET /resolve, /descendants, /species or /assemblies with input=taxon or taxid,
+    # and optionally sub_species=1, mode=traversal or subtree, count_only=1,
+    # answers with json of input, result and seconds taken, errors answered as json of error
+# methods:
+    # do_GET:
+        # answers one query with the client method of its path
+    # send_json:
+        # sends status and json body
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+class QueryHandler(BaseHTTPRequestHandler):
+    client = None
+    methods = {'resolve': [], 'descendants': ['sub_species'], 'species': ['sub_species', 'mode'],
+               'assemblies': ['sub_species', 'mode', 'count_only']} #client methods and the options they take
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        method = url.path.strip('/') #client method queried
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()} #query options, last value kept
+        if method not in self.methods:
+            return self.send_json(404, {'error': f'unknown query /{method}, use /' + ', /'.join(self.methods)})
+        if not params.get('input'):
+            return self.send_json(400, {'error': 'input of taxon or taxid required'})
+        if params.get('mode', 'traversal') not in ('traversal', 'subtree'):
+            return self.send_json(400, {'error': 'mode is traversal or subtree'})
+        options = {} #options taken by client method
+        for option in self.methods[method]:
+            if option in params:
+                options[option] = params[option] if option == 'mode' else params[option].lower() in ('1', 'true', 'yes')
+        start = time.monotonic()
+        try:
+            result = getattr(self.client, method)(params['input'], **options)
+        except Exception as error: #error of one query answered, service kept running
+            return self.send_json(500, {'error': f'{type(error).__name__}: {error}'})
+        if result is None: #taxon or taxid not found
+            return self.send_json(404, {'error': f"{params['input']} not found in NCBI taxonomy database"})
+        self.send_json(200, {'input': params['input'], 'result': result, 'seconds': round(time.monotonic() - start, 3)})
+
+    def send_json(self, status=200, body=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+#functions of query service
+# ----------------------------------------------------------------------------------------
+
+# serve
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # client:
+        # TaxonGenomeClient answering queries
+    # port:
+        # local port of query service
+# use:
+    # runs the local HTTP/JSON query service until interrupted,
+    # queries answered concurrently, sharing the client's memos, cache and request scheduler
+# return:
+    # no return
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def serve(client=None, port=8000):
+    QueryHandler.client = client
+    server = ThreadingHTTPServer(('127.0.0.1', port), QueryHandler)
+    print(f'serving queries on http://127.0.0.1:{port}/, for example /assemblies?input=Hominidae') #prints to standard output service address
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt: #service stopped by user
+        pass
+    server.server_close()
+
 # main code
 # --------------------------------------------------------------------------------------
-#two dictionaries created from child_find function
-generations_and_species = child_find(args.user_input, args.sub_species)
-# print(is_species)
-#dictionaries looped through to output species_list
-species_list=species_find(generations_and_species[0],generations_and_species[1])
-#number of assembled genomes printed out for each species
-genomes = assembled_genome_find(species_list)
-# print(genomes)
-print_to_output(genomes,args.outputfile)
+if __name__ == '__main__': #run from command line, not imported
+    args=parser.parse_args()#parses command line
+    if args.input_file and args.resume: #checkpoint holds progress of one taxon only
+        parser.error('--resume can not be used with --input_file')
+    if args.resume and args.mode == 'subtree' and not (args.taxdump or args.assembly_summary or args.count_only): #subtree and assembly searches not checkpointed
+        parser.error('--resume can not be used with -m subtree, unless with --taxdump, --assembly_summary or --count_only')
+    if args.update and (args.input_file or args.count_only): #previous output file holds genome ids of one taxon only
+        parser.error('--update can not be used with --input_file or --count_only')
+    if args.since and not args.update: #date only used to update previous output file
+        parser.error('--since can only be used with --update')
+    if args.since: #date of previous run checked before any search
+        try:
+            time.strptime(args.since.replace('-', '/'), '%Y/%m/%d')
+        except ValueError:
+            parser.error('--since takes a date as YYYY/MM/DD')
+    if args.serve and (args.resume or args.update): #service answers many queries, each of its own
+        parser.error('--resume and --update can not be used with --serve')
+    #request scheduler, connection pool, response cache and offline indexes set up from command line
+    client = TaxonGenomeClient(args.email, args.api_key, args.threads, None if args.no_cache else args.cache, args.cache_size,
+                               args.refresh, args.taxdump, args.assembly_summary, args.page_size, args.timeout, args.retries,
+                               args.batch_size, args.sub_species, args.mode, args.pipeline, profile=args.profile, trace=args.trace)
+    if args.update: #modification dates of assemblies searched and genomes of previous output file
+        update_window = (args.since.replace('-', '/') if args.since else time.strftime('%Y/%m/%d', time.localtime(os.path.getmtime(args.update))),
+                         time.strftime('%Y/%m/%d'))
+        previous_genomes = output_read(args.update)
+        #prints to standard output dates of assemblies searched
+        print(f'updating {args.update} with assemblies added or modified from {update_window[0]} to {update_window[1]}')
+    if args.resume: #checkpoint of run progress
+        checkpoint = Checkpoint(args.resume, {'user_input': args.user_input, 'sub_species': args.sub_species,
+                                              'mode': args.mode, 'count_only': args.count_only,
+                                              'update': list(update_window) if update_window else None})
+    if args.serve: #queries answered until interrupted
+        serve(client, args.serve)
+    elif args.input_file: #every input of input file searched, with an output file for each
+        batch_genomes = batch_find(args.input_file, args.sub_species, args.batch_size, args.mode, args.pipeline, args.count_only)
+        if args.outputfile:
+            for query, genomes in batch_genomes.items():
+                print_to_output(genomes, output_name(args.outputfile, query))
+    else:
+        genomes = client.assemblies(args.user_input, count_only=args.count_only)
+        if genomes is None: #taxon or taxid not found, exits script
+            exit()
+        # print(genomes)
+        print_to_output(genomes,args.outputfile or args.update)
+    if profiler and args.profile: #prints to standard output profile of run
+        profiler.summary()
+    client.close() #ends trace file and closes cache and indexes
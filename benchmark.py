@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Title: benchmark.py
+Date: October 18th, 2026
+Description:
+    This program benchmarks NCBI_Taxon_Genome_link.py offline, against a local mock of NCBI's E-utilities
+
+List of classes:
+    SyntheticTaxonomy:
+        synthetic taxonomy of given depth and fan-out, with assemblies for every species, the fixtures replayed by the mock server
+    MockHandler:
+        HTTP request handler of the mock server, answering esearch, efetch and esummary from a SyntheticTaxonomy
+        with injected latency and 429 throttling
+
+List of functions:
+    search_xml:
+        esearch xml of one page of ids
+    taxa_xml:
+        efetch xml of taxonomy records
+    summary_xml:
+        esummary xml of assembly summaries
+    scenario_run:
+        runs one scenario in its own process against the mock server, returning its measurements
+    child_run:
+        runs NCBI_Taxon_Genome_link's TaxonGenomeClient inside the scenario process
+    report:
+        prints table of measurements of every scenario, and regressions against a baseline
+
+List of "non standard modules"
+    No "non standard modules" are used in the program, NCBI_Taxon_Genome_link.py needs lxml.
+
+Procedure:
+    1. build synthetic taxonomy of scenario
+    2. start mock E-utilities server on a local port
+    3. run TaxonGenomeClient against the mock server in a new process, timing first and last result
+    4. count requests and bytes sent by the mock server
+    5. print table of wall time, requests, bytes, peak RSS and time to first result
+    6. compare against a baseline file of an earlier benchmark, when given
+
+Usage:
+    python benchmark.py [-h] [--scenario {species,family,order,custom} [...]] [--depth DEPTH] [--fanout FANOUT]
+                        [--assemblies ASSEMBLIES] [--latency LATENCY] [--throttle THROTTLE] [--rate RATE]
+                        [--threads THREADS] [--page_size PAGE_SIZE] [-m {traversal,subtree}] [-p] [-c]
+                        [--output OUTPUT] [--baseline BASELINE] [--tolerance TOLERANCE]
+
+known error:
+    1. fixtures are synthetic, names and xml only hold the elements NCBI_Taxon_Genome_link.py reads
+    2. peak RSS is not measured on Windows
+ """
+
+# import modules
+# ----------------------------------------------------------------------------------------
+import os #module for file paths
+import sys #module for running scenarios in their own process
+import json #module for passing scenarios and saving measurements
+import time #module for timing and injected latency
+import random #module for injected 429 throttling
+import argparse #module for terminal use
+import threading #module for running the mock server beside the scenario
+import subprocess #module for running scenarios in their own process
+from xml.sax.saxutils import escape #module for xml escaping of taxa
+from urllib.parse import urlsplit, parse_qs #module for reading E-utilities queries
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer #module for the mock server
+try: #peak RSS of scenario process
+    import resource
+except ImportError: #not available on Windows
+    resource = None
+
+#argparse
+# ----------------------------------------------------------------------------------------
+#program description
+usage='This program benchmarks NCBI_Taxon_Genome_link.py offline, against a local mock of NCBI E-utilities'
+parser=argparse.ArgumentParser(description=usage)#create an argument parser
+#creates the argument for scenarios run
+parser.add_argument('--scenario',
+                    dest='scenario',
+                    nargs='+',
+                    choices=['species', 'family', 'order', 'custom'],
+                    default=['species', 'family', 'order'],
+                    help='scenarios run (default species family order)')
+#creates the optional argument for depth of custom taxonomy
+parser.add_argument('--depth',
+                    metavar='DEPTH',
+                    dest='depth',
+                    type=int,
+                    default=3,
+                    help='generations of taxa above species in custom scenario (default 3)')
+#creates the optional argument for fan-out of custom taxonomy
+parser.add_argument('--fanout',
+                    metavar='FANOUT',
+                    dest='fanout',
+                    type=int,
+                    default=5,
+                    help='children taxa of every taxon in custom scenario (default 5)')
+#creates the optional argument for assemblies of every species of custom taxonomy
+parser.add_argument('--assemblies',
+                    metavar='ASSEMBLIES',
+                    dest='assemblies',
+                    type=int,
+                    default=10,
+                    help='assemblies of every species in custom scenario (default 10)')
+#creates the optional argument for injected latency
+parser.add_argument('--latency',
+                    metavar='LATENCY',
+                    dest='latency',
+                    type=float,
+                    default=0.02,
+                    help='seconds the mock server waits before every answer (default 0.02)')
+#creates the optional argument for injected throttling
+parser.add_argument('--throttle',
+                    metavar='THROTTLE',
+                    dest='throttle',
+                    type=float,
+                    default=0.01,
+                    help='fraction of requests answered 429 with Retry-After 0.1 (default 0.01)')
+#creates the optional argument for request rate limit
+parser.add_argument('--rate',
+                    metavar='RATE',
+                    dest='rate',
+                    type=float,
+                    default=1000,
+                    help="requests per second allowed, instead of NCBI's limit (default 1000)")
+#creates the optional argument for number of concurrent requests
+parser.add_argument('--threads',
+                    metavar='THREADS',
+                    dest='threads',
+                    type=int,
+                    default=10,
+                    help='number of concurrent requests (default 10)')
+#creates the optional argument for number of ids per page
+parser.add_argument('--page_size',
+                    metavar='PAGE_SIZE',
+                    dest='page_size',
+                    type=int,
+                    default=10000,
+                    help='number of ids per page of searches (default 10000)')
+#creates the optional argument for how species below the taxon are found
+parser.add_argument('-m', '--mode',
+                    dest='mode',
+                    choices=['traversal', 'subtree'],
+                    default='traversal',
+                    help='traversal or subtree (default traversal)')
+#creates the argument to search assemblies while children taxa are still being found
+parser.add_argument('-p', '--pipeline',
+                    action='store_true',
+                    dest='pipeline',
+                    help='searches assemblies of each species as soon as it is found, in traversal mode')
+#creates the argument to find only the number of assembled genomes
+parser.add_argument('-c', '--count_only',
+                    action='store_true',
+                    dest='count_only',
+                    help='finds only the number of assembled genomes of each species')
+#creates the optional argument for measurements file
+parser.add_argument('--output',
+                    metavar='OUTPUT',
+                    dest='output',
+                    help='json file measurements are saved to, as baseline of later benchmarks')
+#creates the optional argument for baseline measurements file
+parser.add_argument('--baseline',
+                    metavar='BASELINE',
+                    dest='baseline',
+                    help='json file of earlier measurements, regressions reported and exit status 1')
+#creates the optional argument for tolerated regression
+parser.add_argument('--tolerance',
+                    metavar='TOLERANCE',
+                    dest='tolerance',
+                    type=float,
+                    default=0.2,
+                    help='fraction a measurement may grow over baseline before reported as regression (default 0.2)')
+#creates the hidden argument for running a scenario in its own process
+parser.add_argument('--child',
+                    dest='child',
+                    help=argparse.SUPPRESS)
+
+#global variables
+# ----------------------------------------------------------------------------------------
+#fixed scenarios, taxon searched, taxonomic ranks from taxon to species, children of every taxon and assemblies of every species
+scenarios = {'species': {'input': 'Homo sapiens', 'ranks': ['species'], 'fanout': 0, 'assemblies': 1220},
+             'family': {'input': 'Hominidae', 'ranks': ['family', 'genus', 'species'], 'fanout': 5, 'assemblies': 40},
+             'order': {'input': 'Synthetiformes', 'ranks': ['order', 'suborder', 'family', 'genus', 'species'],
+                       'fanout': 10, 'assemblies': 3}}
+retry_after = '0.1' #seconds throttled requests are asked to wait
+first_result = 'number of assembled genomes for' #start of line printed for every species found
+program = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'NCBI_Taxon_Genome_link.py') #program benchmarked
+measured = ['wall', 'first_result', 'requests', 'bytes', 'peak_rss'] #measurements compared against baseline
+
+#classes
+# ----------------------------------------------------------------------------------------
+
+# SyntheticTaxonomy
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # name:
+        # scientific name of top taxon
+    # ranks:
+        # taxonomic ranks from top taxon to species
+    # fanout:
+        # children taxa of every taxon above species
+    # assemblies:
+        # assemblies of every species
+# use:
+    # synthetic taxonomy of given depth and fan-out, with assemblies for every species,
+    # taxids numbered breadth first from 1, assembly modification dates spread over 2015 to 2024,
+    # the same taxonomy built every time, so measurements compare between runs
+# methods:
+    # below:
+        # taxids of all taxa below a taxid, of given taxonomic ranks
+    # genomes:
+        # assembly ids of all species below a taxid, modified between dates when given
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+class SyntheticTaxonomy:
+    def __init__(self, name=None, ranks=None, fanout=0, assemblies=0):
+        self.name = {1: name} #taxid and scientific name
+        self.rank = {1: ranks[0]} #taxid and taxonomic rank
+        self.parent = {1: None} #taxid and parent taxid
+        self.children = {1: []} #taxid and children taxids
+        generation = [1] #taxids of current generation
+        for rank in ranks[1:]: #for every generation below top taxon
+            next_generation = []
+            for parent in generation:
+                for n in range(fanout):
+                    taxid = len(self.name) + 1
+                    if rank == 'species': #species name from genus, as NCBI
+                        self.name[taxid] = f"{self.name[parent].split()[0]} species{taxid}"
+                    else:
+                        self.name[taxid] = f"{rank.capitalize()}{taxid}"
+                    self.rank[taxid] = rank
+                    self.parent[taxid] = parent
+                    self.children[taxid] = []
+                    self.children[parent].append(taxid)
+                    next_generation.append(taxid)
+            generation = next_generation
+        self.taxid = {name: taxid for taxid, name in self.name.items()} #scientific name and taxid
+        self.assemblies = {} #species taxid and its assembly ids and modification dates
+        uid = 1000000 #first assembly id
+        for taxid, rank in self.rank.items():
+            if rank == 'species':
+                self.assemblies[taxid] = [(str(uid + n), f'{2015 + (uid + n) % 10}/01/01') for n in range(assemblies)]
+                uid += assemblies
+        self.species_of = {uid: taxid for taxid, genomes in self.assemblies.items() for uid, date in genomes} #assembly id and species
+
+    def below(self, taxid=None, ranks=None):
+        found = [] #taxids below taxid
+        stack = [taxid]
+        while stack: #walks taxonomy depth first
+            ID = stack.pop()
+            if self.rank[ID] in ranks:
+                found.append(ID)
+            stack.extend(reversed(self.children[ID]))
+        return found
+
+    def genomes(self, taxid=None, dates=None):
+        genome_list = [] #assembly ids below taxid
+        for species in self.below(taxid, ['species']):
+            for uid, date in self.assemblies[species]:
+                if not dates or dates[0] <= date <= dates[1]:
+                    genome_list.append(uid)
+        return sorted(genome_list, key=int, reverse=True) #newest first, as NCBI
+
+# MockHandler
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # taxonomy:
+        # SyntheticTaxonomy answered from, set on the server
+    # latency, throttle:
+        # seconds waited before every answer and fraction of requests answered 429, set on the server
+# use:
+    # HTTP request handler of the mock server, answering esearch, efetch and esummary GET and POST requests
+    # from a SyntheticTaxonomy, with searches posted to a history server and read back a page at a time,
+    # connections kept alive as NCBI, requests and bytes sent counted for every E-utility
+# methods:
+    # do_GET, do_POST:
+        # answers one request
+    # answer:
+        # answers one request with the E-utility of its path
+    # esearch, efetch, esummary:
+        # xml of one E-utility request
+    # send:
+        # sends status and body, counting requests and bytes
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' #keep-alive connections
+
+    def do_GET(self):
+        self.answer(urlsplit(self.path).query)
+
+    def do_POST(self):
+        self.answer(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode())
+
+    def answer(self, query=None):
+        server = self.server
+        utility = urlsplit(self.path).path.rsplit('/', 1)[-1].split('.')[0] #E-utility of path
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        time.sleep(server.latency)
+        with server.lock:
+            throttled = server.random.random() < server.throttle
+        if throttled: #request throttled, as NCBI above its rate limit
+            return self.send(utility, 429, b'{"error":"API rate limit exceeded"}', {'Retry-After': retry_after})
+        if utility not in ('esearch', 'efetch', 'esummary'):
+            return self.send(utility, 404, b'unknown E-utility')
+        self.send(utility, 200, getattr(self, utility)(params).encode())
+
+    def esearch(self, params=None):
+        taxonomy = self.server.taxonomy
+        term = params.get('term', '').strip()
+        retstart = int(params.get('RetStart', 0))
+        retmax = int(params.get('RetMax', 20))
+        dates = (params['mindate'], params['maxdate']) if 'mindate' in params else None
+        if term.startswith('#'): #search read back from history server
+            id_list = self.server.history[(params['WebEnv'], term[1:])]
+        elif term.endswith('[next level]'): #children of taxon
+            taxid = taxonomy.taxid.get(term[:-len('[next level]')].strip('"'))
+            id_list = [str(ID) for ID in taxonomy.children[taxid]] if taxid else []
+        elif '[Subtree]' in term: #taxa of ranks below taxid
+            ranks = [rank.split('[')[0] for rank in term.split('(')[1].rstrip(')').split(' OR ')]
+            id_list = [str(ID) for ID in taxonomy.below(int(term[4:term.index('[')]), ranks)]
+        elif '[Organism:exp]' in term: #assemblies below taxid
+            id_list = taxonomy.genomes(int(term[4:term.index('[')]), dates)
+        elif params.get('db') == 'assembly': #assemblies of species
+            taxid = taxonomy.taxid.get(term.strip('"'))
+            id_list = taxonomy.genomes(taxid, dates) if taxid else []
+        else: #taxid of taxon
+            taxid = taxonomy.taxid.get(term.strip('"'))
+            id_list = [str(taxid)] if taxid else []
+        history = None
+        if params.get('usehistory') == 'y' and not term.startswith('#'): #search posted to history server
+            with self.server.lock:
+                history = (f'MCID_{len(self.server.history) + 1}', '1')
+                self.server.history[history] = id_list
+        if params.get('rettype') == 'count':
+            return search_xml([], len(id_list))
+        return search_xml(id_list[retstart:retstart+retmax], len(id_list), retstart, history)
+
+    def efetch(self, params=None):
+        taxonomy = self.server.taxonomy
+        return taxa_xml(taxonomy, [int(ID.strip('"')) for ID in params.get('id', '').split(',') if ID.strip('"').isdigit()
+                                   and int(ID.strip('"')) in taxonomy.name])
+
+    def esummary(self, params=None):
+        taxonomy = self.server.taxonomy
+        return summary_xml([(uid, taxonomy.species_of[uid]) for uid in params.get('id', '').split(',') if uid in taxonomy.species_of])
+
+    def send(self, utility=None, status=200, body=b'', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/xml' if status == 200 else 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            stats = self.server.stats.setdefault(utility, {'requests': 0, 'bytes': 0, 'throttled': 0})
+            stats['requests'] += 1
+            stats['bytes'] += len(body)
+            stats['throttled'] += status == 429
+
+    def log_message(self, format, *args): #requests not logged
+        pass
+
+#functions
+# ----------------------------------------------------------------------------------------
+
+# search_xml
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # id_list:
+        # ids of page
+    # count:
+        # number of ids of whole search
+    # retstart:
+        # first id of page
+    # history:
+        # (WebEnv, QueryKey) of search posted to history server
+# use:
+    # esearch xml of one page of ids
+# return:
+    # xml as string
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def search_xml(id_list=None, count=0, retstart=0, history=None):
+    history_xml = f'<QueryKey>{history[1]}</QueryKey><WebEnv>{history[0]}</WebEnv>' if history else ''
+    ids = ''.join(f'<Id>{ID}</Id>' for ID in id_list)
+    return (f'<?xml version="1.0" encoding="UTF-8" ?>\n<eSearchResult><Count>{count}</Count><RetMax>{len(id_list)}</RetMax>'
+            f'<RetStart>{retstart}</RetStart>{history_xml}<IdList>{ids}</IdList></eSearchResult>\n')
+
+# taxa_xml
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # taxonomy:
+        # SyntheticTaxonomy of taxids
+    # taxid_list:
+        # taxids fetched
+# use:
+    # efetch xml of taxonomy records, with lineage and nested lineage taxa as NCBI
+# return:
+    # xml as string
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def taxa_xml(taxonomy=None, taxid_list=None):
+    records = []
+    for taxid in taxid_list:
+        lineage = [] #taxids above taxid, from top taxon
+        parent = taxonomy.parent[taxid]
+        while parent:
+            lineage.insert(0, parent)
+            parent = taxonomy.parent[parent]
+        lineage_ex = ''.join(f'<Taxon><TaxId>{ID}</TaxId><ScientificName>{escape(taxonomy.name[ID])}</ScientificName>'
+                             f'<Rank>{taxonomy.rank[ID]}</Rank></Taxon>' for ID in lineage)
+        records.append(f'<Taxon><TaxId>{taxid}</TaxId><ScientificName>{escape(taxonomy.name[taxid])}</ScientificName>'
+                       f'<ParentTaxId>{taxonomy.parent[taxid] or 1}</ParentTaxId><Rank>{taxonomy.rank[taxid]}</Rank>'
+                       f'<Lineage>{escape("; ".join(taxonomy.name[ID] for ID in lineage))}</Lineage>'
+                       f'<LineageEx>{lineage_ex}</LineageEx></Taxon>')
+    return f'<?xml version="1.0" ?>\n<TaxaSet>{"".join(records)}</TaxaSet>\n'
+
+# summary_xml
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # summaries:
+        # list of (assembly id, species taxid)
+# use:
+    # esummary xml of assembly summaries
+# return:
+    # xml as string
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def summary_xml(summaries=None):
+    documents = ''.join(f'<DocumentSummary uid="{uid}"><SpeciesTaxid>{taxid}</SpeciesTaxid></DocumentSummary>'
+                        for uid, taxid in summaries)
+    return f'<?xml version="1.0" encoding="UTF-8" ?>\n<eSummaryResult><DocumentSummarySet>{documents}</DocumentSummarySet></eSummaryResult>\n'
+
+# scenario_run
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # scenario:
+        # dictionary of input, ranks, fanout and assemblies of scenario
+    # args:
+        # parsed command line
+# use:
+    # builds synthetic taxonomy of scenario and serves it from a mock server on a local port,
+    # runs the scenario in its own process so peak RSS is of the scenario only,
+    # time to first result taken from when the first species result is printed
+# return:
+    # measurements:
+        # dictionary of wall time, time to first result, requests, bytes, throttled requests,
+        # peak RSS, species and genomes found
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def scenario_run(scenario=None, args=None):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockHandler)
+    server.daemon_threads = True
+    server.taxonomy = SyntheticTaxonomy(scenario['input'], scenario['ranks'], scenario['fanout'], scenario['assemblies'])
+    server.latency = args.latency
+    server.throttle = args.throttle
+    server.random = random.Random(0) #same requests throttled every run
+    server.lock = threading.Lock()
+    server.history = {} #searches posted to history server
+    server.stats = {} #requests and bytes of every E-utility
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    child = {'input': scenario['input'], 'eutils': f'http://127.0.0.1:{server.server_address[1]}/entrez/eutils/',
+             'rate': args.rate, 'threads': args.threads, 'page_size': args.page_size, 'mode': args.mode,
+             'pipeline': args.pipeline, 'count_only': args.count_only}
+    #scenario run unbuffered, so printed results are read as soon as printed
+    process = subprocess.Popen([sys.executable, '-u', os.path.abspath(__file__), '--child', json.dumps(child)],
+                               stdout=subprocess.PIPE, text=True)
+    start = first = None
+    result = {}
+    for line in process.stdout: #results timed as read
+        if line.startswith('benchmark start'):
+            start = time.perf_counter()
+        elif line.startswith(first_result) and first is None:
+            first = time.perf_counter()
+        elif line.startswith('benchmark result '):
+            result = json.loads(line[len('benchmark result '):])
+    process.wait()
+    server.shutdown()
+    server.server_close()
+    if process.returncode or not result: #prints to standard output that scenario failed
+        print(f"scenario {scenario['input']} failed with exit status {process.returncode}")
+        return None
+    result['first_result'] = first - start if first else None
+    result['requests'] = sum(stats['requests'] for stats in server.stats.values())
+    result['bytes'] = sum(stats['bytes'] for stats in server.stats.values())
+    result['throttled'] = sum(stats['throttled'] for stats in server.stats.values())
+    result['endpoints'] = server.stats
+    return result
+
+# child_run
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # child:
+        # dictionary of input, E-utilities url and options of scenario
+# use:
+    # runs NCBI_Taxon_Genome_link's TaxonGenomeClient against the mock server, without response cache,
+    # the rate limiter set to rate instead of NCBI's limit, as the mock server has none,
+    # prints measurements as json for scenario_run
+# return:
+    # no return
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def child_run(child=None):
+    sys.path.insert(0, os.path.dirname(program))
+    import NCBI_Taxon_Genome_link as taxon_genome_link
+    client = taxon_genome_link.TaxonGenomeClient('benchmark@example.com', threads=child['threads'], cache=None,
+                                                 page_size=child['page_size'], mode=child['mode'], pipeline=child['pipeline'],
+                                                 eutils_url=child['eutils'], rate=child['rate'])
+    print('benchmark start')
+    start = time.perf_counter()
+    genomes = client.assemblies(child['input'], count_only=child['count_only'])
+    wall = time.perf_counter() - start
+    peak_rss = None
+    if resource: #kilobytes on Linux, bytes on macOS
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024*1024 if sys.platform == 'darwin' else 1024)
+    print('benchmark result ' + json.dumps({'wall': wall, 'peak_rss': peak_rss, 'species': len(genomes),
+                                            'genomes': sum(found if child['count_only'] else len(found) for found in genomes.values())}))
+    client.close()
+
+# report
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# input variables:
+    # results:
+        # dictionary of scenario and its measurements
+    # baseline:
+        # dictionary of scenario and its measurements of an earlier benchmark, or None
+    # tolerance:
+        # fraction a measurement may grow over baseline before reported as regression
+# use:
+    # prints table of measurements of every scenario, requests and bytes of every E-utility,
+    # and measurements grown more than tolerance over baseline
+# return:
+    # regressions:
+        # list of regressions found
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+def report(results=None, baseline=None, tolerance=0.2):
+    print(f"\n{'scenario':<10}{'species':>9}{'genomes':>10}{'wall s':>9}{'first s':>9}{'requests':>10}{'429s':>6}{'MB sent':>9}{'peak MB':>9}")
+    for name, result in results.items():
+        first = f"{result['first_result']:.3f}" if result['first_result'] is not None else '-'
+        peak = f"{result['peak_rss']:.1f}" if result['peak_rss'] is not None else '-'
+        print(f"{name:<10}{result['species']:>9}{result['genomes']:>10}{result['wall']:>9.3f}{first:>9}{result['requests']:>10}"
+              f"{result['throttled']:>6}{result['bytes']/1e6:>9.2f}{peak:>9}")
+    print(f"\n{'scenario':<10}{'E-utility':<11}{'requests':>10}{'MB sent':>9}")
+    for name, result in results.items():
+        for utility, stats in sorted(result['endpoints'].items()):
+            print(f"{name:<10}{utility:<11}{stats['requests']:>10}{stats['bytes']/1e6:>9.2f}")
+    regressions = []
+    for name, result in results.items():
+        for measure in measured:
+            old = (baseline or {}).get(name, {}).get(measure)
+            new = result.get(measure)
+            if old and new is not None and new > old * (1 + tolerance):
+                regressions.append(f'{name} {measure} {old:.3f} -> {new:.3f} (+{(new/old - 1)*100:.0f}%)')
+    if baseline:
+        print('\nregressions over baseline:' if regressions else '\nno regressions over baseline')
+        for regression in regressions:
+            print(f'    {regression}')
+    return regressions
+
+# main code
+# --------------------------------------------------------------------------------------
+if __name__ == '__main__': #run from command line, not imported
+    args=parser.parse_args()#parses command line
+    if args.child: #scenario process
+        child_run(json.loads(args.child))
+        sys.exit()
+    scenarios['custom'] = {'input': 'Customidae', 'ranks': ['clade'] * args.depth + ['species'],
+                           'fanout': args.fanout, 'assemblies': args.assemblies}
+    results = {} #measurements of every scenario
+    for name in args.scenario:
+        print(f'running scenario {name}') #prints to standard output scenario being run
+        result = scenario_run(scenarios[name], args)
+        if result:
+            results[name] = result
+    baseline = None
+    if args.baseline: #measurements of an earlier benchmark
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    regressions = report(results, baseline, args.tolerance)
+    if args.output: #measurements saved, as baseline of later benchmarks
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=1)
+    sys.exit(1 if regressions or len(results) < len(args.scenario) else 0)